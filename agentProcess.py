@@ -0,0 +1,138 @@
+# agentProcess.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Hosts an agent in a child process, so that a call which runs past its time
+limit can be stopped for good by killing the process.  This works from any
+thread and with millisecond limits, unlike signal.alarm:
+
+  host = AgentProcess(agent, layout)
+  host.call('registerInitialState', 30, state)
+  action = host.call('getAction', 0.05, state)   # TimeoutFunctionException after 50 ms
+  host.close()                                   # copies the agent's attributes back
+
+States are pickled for every call.  Their layout is not: both processes
+already hold it, so the pickles only refer to it (dumps and loads, which
+the MCTSAgent worker pool uses too).  Game.run hosts its agents this way when
+--catchExceptions is on.
+"""
+
+from util import TimeoutFunctionException
+import multiprocessing
+import cPickle, cStringIO
+import traceback
+import random, sys
+
+class AgentProcessError(Exception):
+    "An exception raised by a hosted agent, with the child's traceback as message"
+    pass
+
+def canHost(agent):
+    """
+    Agents that read the display (like KeyboardAgent) set hostable = False,
+    since a child process does not get its window's events.  Daemonic
+    processes (the --workers pool) may not start children at all.
+    """
+    return getattr(agent, 'hostable', True) and not multiprocessing.current_process().daemon
+
+class AgentProcess:
+    def __init__(self, agent, layout):
+        self.agent = agent
+        self.layout = layout
+        self.connection, childConnection = multiprocessing.Pipe()
+        # the child gets a seed of its own: forked children would all
+        # continue this process's random sequence
+        seed = random.randint(0, sys.maxint)
+        self.process = multiprocessing.Process(target=hostAgent,
+                                               args=(agent, layout, seed, childConnection, self.connection))
+        self.process.start()
+        childConnection.close()
+
+    def call(self, method, timeout, *args):
+        """
+        Calls agent.method(*args) in the child and returns the result.  Kills
+        the child and raises TimeoutFunctionException when no answer came
+        within timeout seconds (None waits for as long as it takes).
+        """
+        sendMessage(self.connection, self.layout, (method, args))
+        if not self.connection.poll(timeout):
+            self.kill()
+            raise TimeoutFunctionException()
+        ok, result = receiveMessage(self.connection, self.layout)
+        if not ok: raise AgentProcessError(result)
+        return result
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+    def close(self):
+        """
+        Stops the child.  A child that is still running first sends the
+        agent's attributes back, so the agent object in this process ends
+        the game as it would have without the child (learnt values, logs).
+        """
+        if self.connection.closed:
+            return
+        try:
+            sendMessage(self.connection, self.layout, (None, ()))
+            ok, attributes = receiveMessage(self.connection, self.layout)
+            if ok: self.agent.__dict__.update(attributes)
+        except (EOFError, IOError):
+            pass
+        self.kill()
+
+def hostAgent(agent, layout, seed, connection, parentConnection):
+    "The child's loop: answers calls until the parent closes or goes away."
+    parentConnection.close()
+    random.seed(seed)
+    while True:
+        try:
+            method, args = receiveMessage(connection, layout)
+        except EOFError:
+            return
+        if method == None:
+            break
+        try:
+            result = (True, getattr(agent, method)(*args))
+        except Exception:
+            result = (False, traceback.format_exc())
+        sendMessage(connection, layout, result)
+    try:
+        sendMessage(connection, layout, (True, agent.__dict__))
+    except Exception:
+        # Attributes that can't be pickled (a process pool, say) stay behind
+        sendMessage(connection, layout, (False, None))
+
+def dumps(obj, layout):
+    "Pickles obj with a reference to layout in place of the layout itself."
+    buffer = cStringIO.StringIO()
+    pickler = cPickle.Pickler(buffer, 2)
+    pickler.persistent_id = lambda value: value is layout and 'layout' or None
+    pickler.dump(obj)
+    return buffer.getvalue()
+
+def loads(data, layout):
+    "Unpickles what dumps pickled, with this process's copy of the layout."
+    unpickler = cPickle.Unpickler(cStringIO.StringIO(data))
+    unpickler.persistent_load = lambda pid: layout
+    return unpickler.load()
+
+def sendMessage(connection, layout, message):
+    connection.send_bytes(dumps(message, layout))
+
+def receiveMessage(connection, layout):
+    return loads(connection.recv_bytes(), layout)
@@ -0,0 +1,874 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Micro benchmarks for the forward model and the search agents.
+
+USAGE:      python benchmark.py <benchmark> <options>
+EXAMPLES:   python benchmark.py engines
+            python benchmark.py cow --layouts mediumClassic,originalClassic
+            python benchmark.py engines --layouts smallClassic,originalClassic --steps 5000
+            python benchmark.py mcts --layouts mediumClassic --steps 20000
+            python benchmark.py oracle
+            python benchmark.py concurrent --layouts smallClassic
+            python benchmark.py timeouts --layouts mediumClassic 2>/dev/null
+            python benchmark.py turns --layouts originalClassic
+
+Each benchmark prints a small table to stdout.  The ones that also check
+results (hashing, vector, reuse, oracle, concurrent) raise an Exception when
+a check fails, so python exits with status 1; a quick run such as
+            python benchmark.py hashing --layouts smallClassic,mediumClassic --steps 500
+can gate a CI job.
+"""
+
+from game import Directions
+from game import Agent
+import pacman, layout
+import sys, os, time, random
+
+def allLayoutNames():
+    names = [f[:-4] for f in os.listdir('layouts') if f.endswith('.lay')]
+    names.sort()
+    return names
+
+def loadLayouts(names):
+    layouts = []
+    for name in names:
+        lay = layout.getLayout(name)
+        if lay == None: raise Exception("The layout " + name + " cannot be found")
+        layouts.append((name, lay))
+    return layouts
+
+def initialState(stateType, lay):
+    state = stateType()
+    state.initialize(lay, lay.getNumGhosts())
+    return state
+
+def randomWalk(initState, steps, seed):
+    """
+    Plays random legal pacman moves through generatePacmanSuccessor for the
+    given number of forward model calls, restarting whenever a game ends.
+    Returns (seconds, final scores of every finished game).
+    """
+    random.seed(seed)
+    initState.getContext().currentIterations = steps + 1
+    state = initState
+    scores = []
+    start = time.time()
+    for i in range(steps):
+        legal = state.getLegalPacmanActions()
+        if len(legal) > 0:
+            action = random.choice(legal)
+        else:
+            action = Directions.STOP
+        state = state.generatePacmanSuccessor(action)
+        if state.isWin() or state.isLose():
+            scores.append(state.getScore())
+            state = initState
+    return time.time() - start, scores
+
+def benchmarkEngines(options):
+    """
+    Successors per second of the classic and bitboard GameState engines on
+    every layout.  'same' checks that both engines played the same games.
+    """
+    import bitboard
+    engines = [('classic', pacman.GameState), ('bitboard', bitboard.BitboardGameState)]
+    print '%-20s %12s %12s %8s %5s' % ('layout', 'classic/s', 'bitboard/s', 'speedup', 'same')
+    for name, lay in loadLayouts(options.layouts):
+        rates = []
+        results = []
+        for engineName, stateType in engines:
+            seconds, scores = randomWalk(initialState(stateType, lay), options.steps, options.seed)
+            rates.append(options.steps / max(seconds, 1e-9))
+            results.append(scores)
+        print '%-20s %12.0f %12.0f %7.2fx %5s' % (name, rates[0], rates[1], rates[1] / rates[0],
+                                                  results[0] == results[1])
+
+def retainedBytes(states):
+    """
+    Approximate memory held by a list of classic GameStates, counting every
+    object shared between states only once.
+    """
+    seen = set()
+    def size(obj):
+        if id(obj) in seen: return 0
+        seen.add(id(obj))
+        return sys.getsizeof(obj)
+    total = 0
+    for state in states:
+        data = state.data
+        total += size(state) + size(state.__dict__) + size(data) + size(data.__dict__)
+        total += size(data.food) + size(data.food.__dict__) + size(data.food.data)
+        total += sum([size(column) for column in data.food.data])
+        total += size(data.foodPositions) + size(data.capsules) + size(data._eaten) + size(data.agentStates)
+        for agentState in data.agentStates:
+            total += size(agentState) + size(agentState.__dict__)
+            total += size(agentState.configuration) + size(agentState.configuration.__dict__)
+            total += size(agentState.configuration.pos)
+    return total
+
+def successorChain(initState, steps, seed):
+    random.seed(seed)
+    initState.getContext().currentIterations = steps + 1
+    states = []
+    state = initState
+    for i in range(steps):
+        legal = state.getLegalPacmanActions()
+        state = state.generatePacmanSuccessor(random.choice(legal))
+        states.append(state)
+        if state.isWin() or state.isLose():
+            state = initState
+    return states
+
+def benchmarkCopyOnWrite(options):
+    """
+    Successors per second and retained bytes per successor of the classic
+    engine with eager copies (the old behaviour) and with copy-on-write
+    GameStateData.
+    """
+    from game import GameStateData
+    print '%-20s %6s %12s %14s' % ('layout', 'mode', 'successors/s', 'bytes/successor')
+    for name, lay in loadLayouts(options.layouts):
+        for mode, copyOnWrite in [('eager', False), ('cow', True)]:
+            GameStateData.copyOnWrite = copyOnWrite
+            initState = initialState(pacman.GameState, lay)
+            seconds, scores = randomWalk(initState, options.steps, options.seed)
+            states = successorChain(initState, min(options.steps, 1000), options.seed)
+            print '%-20s %6s %12.0f %14.0f' % (name, mode, options.steps / max(seconds, 1e-9),
+                                               retainedBytes(states) / float(len(states)))
+    GameStateData.copyOnWrite = True
+
+def hashErrors(states):
+    """
+    Checks the Zobrist hashes of states: the incremental hash of each must
+    match computeZobrist, a deep copy must be equal and hash equally, and
+    equal states among the first 300 must hash equally.  Returns (equal
+    pairs found, errors).
+    """
+    errors = 0
+    pairs = 0
+    for state in states:
+        if state.data._zobrist != state.data.computeZobrist(): errors += 1
+        copy = state.deepCopy()
+        if not copy == state or hash(copy) != hash(state): errors += 1
+    sample = states[:300]
+    for i in range(len(sample)):
+        for j in range(i + 1, len(sample)):
+            if sample[i] == sample[j]:
+                pairs += 1
+                if hash(sample[i]) != hash(sample[j]): errors += 1
+    return pairs, errors
+
+def benchmarkHashing(options):
+    """
+    Cost of hashing a fresh successor with the incremental Zobrist hash against
+    recomputing it from the whole board, plus a consistency check: equal
+    states (including deep copies) must hash equally, and the incremental
+    hash must match the from-scratch one (see hashErrors).  Any error fails
+    the benchmark.
+    """
+    print '%-20s %14s %14s %8s %10s %7s' % ('layout', 'recompute/s', 'incremental/s', 'speedup', 'eq pairs', 'errors')
+    failed = []
+    for name, lay in loadLayouts(options.layouts):
+        states = successorChain(initialState(pacman.GameState, lay), options.steps, options.seed)
+        start = time.time()
+        for state in states: state.data.computeZobrist()
+        recompute = time.time() - start
+        start = time.time()
+        for state in states: hash(state)
+        incremental = time.time() - start
+
+        pairs, errors = hashErrors(states)
+        print '%-20s %14.0f %14.0f %7.1fx %10d %7d' % (name, len(states) / max(recompute, 1e-9),
+                                                      len(states) / max(incremental, 1e-9),
+                                                      recompute / max(incremental, 1e-9), pairs, errors)
+        if errors > 0: failed.append(name)
+    if len(failed) > 0:
+        raise Exception('inconsistent state hashes on ' + ', '.join(failed))
+
+def rolloutScores(rootState, rollouts, depth, seed, makeUnmake):
+    """
+    Plays random pacman rollouts of the given depth from rootState, either as
+    a chain of generatePacmanSuccessor calls or with SearchState apply/undo.
+    Returns (seconds, final score of every rollout).
+    """
+    import searchState
+    random.seed(seed)
+    rootState.getContext().currentIterations = rollouts * depth + 1
+    scores = []
+    start = time.time()
+    if makeUnmake:
+        state = searchState.SearchState(rootState)
+        for r in range(rollouts):
+            for d in range(depth):
+                if state.isWin() or state.isLose(): break
+                state.apply(random.choice(state.getLegalPacmanActions()))
+            scores.append(state.getScore())
+            while state.getDepth() > 0: state.undo()
+    else:
+        for r in range(rollouts):
+            state = rootState
+            for d in range(depth):
+                if state.isWin() or state.isLose(): break
+                state = state.generatePacmanSuccessor(random.choice(state.getLegalPacmanActions()))
+            scores.append(state.getScore())
+    return time.time() - start, scores
+
+def benchmarkRollouts(options):
+    """
+    Random rollouts per second from the initial state: a chain of
+    generatePacmanSuccessor calls against SearchState apply/undo.  'same'
+    checks that both produced the same rollout scores.
+    """
+    rollouts = max(1, options.steps / options.depth)
+    print '%-20s %12s %12s %8s %5s' % ('layout', 'successor/s', 'apply/s', 'speedup', 'same')
+    for name, lay in loadLayouts(options.layouts):
+        rootState = initialState(pacman.GameState, lay)
+        chainSeconds, chainScores = rolloutScores(rootState, rollouts, options.depth, options.seed, False)
+        applySeconds, applyScores = rolloutScores(rootState, rollouts, options.depth, options.seed, True)
+        print '%-20s %12.0f %12.0f %7.2fx %5s' % (name, rollouts / max(chainSeconds, 1e-9),
+                                                  rollouts / max(applySeconds, 1e-9),
+                                                  chainSeconds / max(applySeconds, 1e-9),
+                                                  chainScores == applyScores)
+
+def benchmarkVector(options):
+    """
+    Game steps per second of vectorEnv.VectorPacmanEnv at several batch sizes
+    (one step = one pacman move plus every ghost move), and a replay of a
+    small batch through the scalar GameState engine, which fails the
+    benchmark if the two engines disagree.
+    """
+    import vectorEnv
+    if not vectorEnv._NUMPY_ENABLED:
+        print 'The vector benchmark requires numpy.'
+        return
+    print '%-20s %8s %14s %10s' % ('layout', 'games', 'game steps/s', 'compared')
+    for name, lay in loadLayouts(options.layouts):
+        compared = vectorEnv.validate(lay, 20, 100, options.seed)
+        for numGames in [1, 100, 1000, 10000]:
+            env = vectorEnv.VectorPacmanEnv(lay, numGames, seed=options.seed)
+            ticks = max(1, min(1000, options.steps / numGames))
+            start = time.time()
+            for t in range(ticks):
+                env.step(env.randomLegalActions())
+                env.reset(env.done)
+            seconds = time.time() - start
+            print '%-20s %8d %14.0f %10d' % (name, numGames, ticks * numGames / max(seconds, 1e-9), compared)
+
+def benchmarkMcts(options):
+    """
+    UCT iterations per second of pacmanAgents.UTCSearch as its tree grows from
+    the initial state.  --steps iterations are run in ten equal chunks on one
+    tree; the rate should stay flat as the node count climbs past 10k.
+    """
+    import pacmanAgents
+    chunk = max(1, options.steps / 10)
+    print '%-20s %10s %8s %14s' % ('layout', 'iterations', 'nodes', 'iterations/s')
+    for name, lay in loadLayouts(options.layouts):
+        random.seed(options.seed)
+        rootState = initialState(pacman.GameState, lay)
+        searchTree = pacmanAgents.UTCSearchTree()
+        rootState.getContext().currentIterations = sys.maxint
+        for i in range(10):
+            start = time.time()
+            pacmanAgents.UTCSearch(rootState, searchTree, chunk)
+            seconds = time.time() - start
+            print '%-20s %10d %8d %14.0f' % (name, (i + 1) * chunk, searchTree.size, chunk / max(seconds, 1e-9))
+
+def playMoves(agent, state, moves, budget):
+    """
+    Plays up to the given number of moves of agent against random ghosts, with
+    budget forward model calls per move, and returns the last state.
+    """
+    import ghostAgents
+    ghosts = [ghostAgents.RandomGhost(i) for i in range(1, state.getNumAgents())]
+    context = state.getContext()
+    context.maxIterations = budget
+    agent.registerInitialState(state)
+    for move in range(moves):
+        if state.isWin() or state.isLose(): break
+        context.startMove()
+        state = state.generateSuccessor(0, agent.getAction(state))
+        for ghost in ghosts:
+            if state.isWin() or state.isLose(): break
+            state = state.generateSuccessor(ghost.index, ghost.getAction(state))
+    return state
+
+def randomSuccessor(state, action):
+    "Plays action and then a random legal move for every ghost."
+    state = state.generateSuccessor(0, action)
+    for index in range(1, state.getNumAgents()):
+        if state.isWin() or state.isLose(): break
+        state = state.generateSuccessor(index, random.choice(state.getLegalActions(index)))
+    return state
+
+def checkReroot(rootState, rollouts, seed):
+    """
+    Backs the same rollouts from a grandchild of rootState up through a tree
+    that is then re-rooted at the child, and through a fresh tree rooted at
+    the child.  Raises an Exception unless both give the grandchild's action
+    the same visits and mean reward.
+    """
+    import pacmanAgents, searchState
+    random.seed(seed)
+    action = random.choice(rootState.getLegalPacmanActions())
+    child = randomSuccessor(rootState, action)
+    childAction = random.choice(child.getLegalPacmanActions())
+    grandchild = randomSuccessor(child, childAction)
+    rewards = []
+    for i in range(rollouts):
+        state = searchState.SearchState(grandchild)
+        state.getContext().currentIterations = sys.maxint
+        pacmanAgents.defaultPolicy(state)
+        rewards.append(pacmanAgents.rolloutReward(state))
+
+    reused = pacmanAgents.UTCSearchTree()
+    reused.root.untried = rootState.getLegalPacmanActions()
+    node = reused.addChild(reused.root, action, pacmanAgents.ghostOutcome(child))
+    node.untried = child.getLegalPacmanActions()
+    node = reused.addChild(node, childAction, pacmanAgents.ghostOutcome(grandchild))
+    for reward in rewards: pacmanAgents.backup(node, reward)
+    reused.reroot(action, pacmanAgents.ghostOutcome(child))
+
+    fresh = pacmanAgents.UTCSearchTree()
+    fresh.root.untried = child.getLegalPacmanActions()
+    node = fresh.addChild(fresh.root, childAction, pacmanAgents.ghostOutcome(grandchild))
+    for reward in rewards: pacmanAgents.backup(node, reward)
+
+    for tree in [reused, fresh]:
+        visits = tree.root.actionVisits[childAction]
+        mean = tree.root.actionRewards[childAction] / visits
+        if visits != rollouts or abs(mean - sum(rewards) / rollouts) > 1e-9:
+            raise Exception('a re-rooted tree and a fresh tree disagree on the value of ' + str(childAction))
+
+def benchmarkReuse(options):
+    """
+    Plays the first moves of a game with MCTSAgent against random ghosts, with
+    and without keeping the search tree between moves, and reports the nodes
+    carried over from the previous move and the tree size at each decision.
+    --steps is the forward model budget per move.  Checks first that
+    re-rooting keeps the statistics of the new root's subtree valid (see
+    checkReroot).
+    """
+    import pacmanAgents
+    moves = 40
+    print '%-20s %6s %6s %12s %16s %8s' % ('layout', 'reuse', 'moves', 'nodes kept', 'nodes/decision', 'score')
+    for name, lay in loadLayouts(options.layouts):
+        states = successorChain(initialState(pacman.GameState, lay), 20, options.seed)
+        checkReroot([state for state in states if not (state.isWin() or state.isLose())][-1], 50, options.seed)
+        for reuse in [0, 1]:
+            random.seed(options.seed)
+            agent = pacmanAgents.MCTSAgent(reuse = reuse)
+            state = playMoves(agent, initialState(pacman.GameState, lay), moves, options.steps)
+            decisions = float(len(agent.decisions))
+            print '%-20s %6d %6d %12.0f %16.0f %8.0f' % (name, reuse, len(agent.decisions),
+                                                         sum([kept for kept, size in agent.decisions]) / decisions,
+                                                         sum([size for kept, size in agent.decisions]) / decisions,
+                                                         state.getScore())
+
+def benchmarkParallel(options):
+    """
+    Decisions per second and decision quality of root and leaf parallel MCTS
+    with 1 to 16 worker processes, on ten states of a random walk.  --steps is
+    the forward model budget of each worker per decision.  Quality is judged
+    against a serial search with 32 times that budget: 'agree' is how often
+    the reference action was chosen, 'regret' the mean reference score given
+    up by the chosen action.
+    """
+    import pacmanAgents
+    print '%-20s %5s %8s %12s %7s %8s' % ('layout', 'mode', 'workers', 'decisions/s', 'agree', 'regret')
+    for name, lay in loadLayouts(options.layouts):
+        states = successorChain(initialState(pacman.GameState, lay), 100, options.seed)[::10]
+        states = [state for state in states if not (state.isWin() or state.isLose())]
+        references = []
+        for state in states:
+            searchTree = pacmanAgents.UTCSearchTree()
+            state.getContext().currentIterations = 32 * options.steps + 1
+            pacmanAgents.UTCSearch(state, searchTree)
+            root = searchTree.root
+            references.append(dict([(action, root.actionRewards[action] / root.actionVisits[action])
+                                    for action in root.actionVisits]))
+        for mode in ['root', 'leaf']:
+            for workers in [1, 2, 4, 8, 16]:
+                random.seed(options.seed)
+                pool = pacmanAgents.searchPool(workers, lay)
+                agree = 0
+                regret = 0.0
+                start = time.time()
+                for state, values in zip(states, references):
+                    state.getContext().currentIterations = sys.maxint
+                    if mode == 'root':
+                        action, calls = pacmanAgents.rootParallelSearch(state, pool, workers, options.steps)
+                    else:
+                        action, calls = pacmanAgents.leafParallelSearch(state, pacmanAgents.UTCSearchTree(), pool,
+                                                                        workers, options.steps)
+                    best = max(values.values())
+                    if values.get(action) == best: agree += 1
+                    regret += 1000 * (best - values.get(action, min(values.values())))
+                seconds = time.time() - start
+                pool.close()
+                pool.join()
+                print '%-20s %5s %8d %12.2f %6.0f%% %8.1f' % (name, mode, workers, len(states) / max(seconds, 1e-9),
+                                                             100.0 * agree / len(states), regret / len(states))
+
+def crossoverPopulation(state, size, parents, length):
+    """
+    A population like the ones GeneticAgent scores after crossover: every
+    sequence takes each action from one of two random parents.
+    """
+    parentSeqs = [[random.choice(state.getAllPossibleActions()) for i in range(length)] for p in range(parents)]
+    population = []
+    for i in range(size):
+        mom, dad = random.choice(parentSeqs), random.choice(parentSeqs)
+        population.append([random.choice((mom[j], dad[j])) for j in range(length)])
+    return population
+
+def benchmarkTrie(options):
+    """
+    Forward model calls and seconds to score crossover populations of 5 action
+    sequences from the initial state, one sequence at a time with
+    scoreAndTruncateActionSeq against one sequenceTrie.SequenceEvaluator pass.
+    """
+    import pacmanAgents, sequenceTrie
+    print '%-20s %6s %12s %12s %8s %12s %12s' % ('layout', 'pop', 'seq calls', 'trie calls', 'saved',
+                                                'seq seconds', 'trie seconds')
+    for name, lay in loadLayouts(options.layouts):
+        state = initialState(pacman.GameState, lay)
+        for size in [8, 64, 512]:
+            random.seed(options.seed)
+            population = crossoverPopulation(state, size, 4, 5)
+            context = state.getContext()
+            context.currentIterations = sys.maxint
+            start = time.time()
+            for sequence in population:
+                pacmanAgents.scoreAndTruncateActionSeq(state, sequence[:])
+            seqSeconds = time.time() - start
+            seqCalls = sys.maxint - context.currentIterations
+            evaluator = sequenceTrie.SequenceEvaluator()
+            start = time.time()
+            evaluator.evaluate(state, population)
+            trieSeconds = time.time() - start
+            print '%-20s %6d %12d %12d %7.0f%% %12.4f %12.4f' % (name, size, seqCalls, evaluator.calls,
+                                                              100.0 * (seqCalls - evaluator.calls) / seqCalls,
+                                                              seqSeconds, trieSeconds)
+
+def benchmarkGenetic(options):
+    """
+    Milliseconds per generation from the initial state of GeneticAgent's list
+    population against the vectorGA NumPy population, at growing population
+    sizes with 5 action sequences.  'operators' is selection, crossover and
+    mutation alone; 'generation' adds scoring with a SequenceEvaluator.
+    """
+    import pacmanAgents, sequenceTrie, vectorGA
+    generations = 5
+    print '%-20s %6s %6s %14s %14s' % ('layout', 'engine', 'pop', 'operators ms', 'generation ms')
+    for name, lay in loadLayouts(options.layouts):
+        state = initialState(pacman.GameState, lay)
+        state.getContext().currentIterations = sys.maxint
+        for size in [8, 64, 256]:
+            random.seed(options.seed)
+            evaluator = sequenceTrie.SequenceEvaluator()
+            population = [pacmanAgents.chromActionSequence(pacmanAgents.buildRandomSequence(state)) for i in range(size)]
+            pacmanAgents.scorePopulation(state, population, evaluator)
+            start = time.time()
+            for g in range(generations):
+                population = pacmanAgents.evolvePopulation(population, state, evaluator)
+            seconds = time.time() - start
+            print '%-20s %6s %6d %14s %14.2f' % (name, 'list', size, '-', 1000 * seconds / generations)
+        if not vectorGA._NUMPY_ENABLED:
+            print 'The vectorGA rows require numpy.'
+            continue
+        for size in [8, 64, 256, 1024, 4096]:
+            evaluator = sequenceTrie.SequenceEvaluator()
+            population = vectorGA.Population(size, 5, options.seed)
+            population.evaluate(state, evaluator)
+            operators = 0.0
+            start = time.time()
+            for g in range(generations):
+                opStart = time.time()
+                population.evolve()
+                operators += time.time() - opStart
+                population.evaluate(state, evaluator)
+            seconds = time.time() - start
+            print '%-20s %6s %6d %14.2f %14.2f' % (name, 'numpy', size, 1000 * operators / generations,
+                                                 1000 * seconds / generations)
+
+def benchmarkRolling(options):
+    """
+    Final scores of HillClimberAgent and GeneticAgent with and without
+    rolling horizon search, over five games of at most 300 moves against
+    random ghosts with the same seeds.  --steps is the forward model budget
+    per move.
+    """
+    import pacmanAgents
+    games = 5
+    print '%-20s %18s %8s %10s %6s' % ('layout', 'agent', 'rolling', 'avg score', 'wins')
+    for name, lay in loadLayouts(options.layouts):
+        for agentType in [pacmanAgents.HillClimberAgent, pacmanAgents.GeneticAgent]:
+            for rolling in [0, 1]:
+                scores = []
+                wins = 0
+                for game in range(games):
+                    random.seed(options.seed + game)
+                    state = playMoves(agentType(rolling = rolling), initialState(pacman.GameState, lay), 300,
+                                      options.steps)
+                    scores.append(state.getScore())
+                    wins += state.isWin()
+                print '%-20s %18s %8d %10.1f %6d' % (name, agentType.__name__, rolling,
+                                                    sum(scores) / float(games), wins)
+
+def benchmarkOracle(options):
+    """
+    Maze distances on generated mazes from 20x20 to 1000x1000 with 10% extra
+    openings, through the Layout that agents use: the time to build the
+    Layout, where Layout.getMazeDistance answers from (the all pairs table or
+    the landmark oracle, see layout.MAZE_DISTANCE_TABLE_LIMIT), the build
+    time and memory of the exact oracle (8 landmarks), and the query latency
+    of getMazeDistance and of an oracle with epsilon 0.1 against a plain
+    breadth first search per query.  'error' is the largest relative error
+    seen with epsilon 0.1; 'table MB' is what the all pairs table of
+    mazeDistances.py would need.
+    """
+    import distanceOracle, mazeGenerator
+    print '%-10s %8s %8s %7s %8s %8s %10s %10s %8s %10s %10s' % ('board', 'cells', 'layout s', 'source',
+        'build s', 'MB', 'exact us', 'eps us', 'error', 'bfs us', 'table MB')
+    for size in [20, 50, 100, 200, 500, 1000]:
+        start = time.time()
+        lay = layout.Layout(mazeGenerator.generateMazeText(size, size, options.seed, loops=0.1, food=0))
+        layoutTime = time.time() - start
+        source = lay.numFreeCells > layout.MAZE_DISTANCE_TABLE_LIMIT and 'oracle' or 'table'
+        start = time.time()
+        oracle = lay.getDistanceOracle()
+        build = time.time() - start
+        approximate = lay.getDistanceOracle(8, 0.1)
+        cells = lay.walls.asList(False)
+        rand = random.Random(options.seed)
+        pairs = [(rand.choice(cells), rand.choice(cells)) for i in range(100)]
+        bfsPairs = pairs[:max(3, min(100, 200000 / len(cells)))]
+
+        lay.getMazeDistance(cells[0], cells[0]) # builds the table on small boards
+        start = time.time()
+        exact = [lay.getMazeDistance(p1, p2) for p1, p2 in pairs]
+        exactTime = (time.time() - start) / len(pairs)
+        start = time.time()
+        bounded = [approximate.getDistance(p1, p2) for p1, p2 in pairs]
+        boundedTime = (time.time() - start) / len(pairs)
+        start = time.time()
+        cell = lambda (x, y): x * oracle.height + y
+        truth = [distanceOracle.bfsDistance(oracle.free, oracle.height, cell(p1), cell(p2)) for p1, p2 in bfsPairs]
+        bfsTime = (time.time() - start) / len(bfsPairs)
+        if truth != exact[:len(truth)] or truth != [oracle.getDistance(p1, p2) for p1, p2 in bfsPairs]:
+            raise Exception('maze distances and breadth first search disagree on ' + str(size))
+        error = max([(b - e) / float(max(e, 1)) for b, e in zip(bounded, exact)])
+        print '%-10s %8d %8.2f %7s %8.2f %8.1f %10.0f %10.0f %7.1f%% %10.0f %10.0f' % (
+            '%dx%d' % (lay.width, lay.height), len(cells), layoutTime, source, build, oracle.memoryBytes() / 1e6,
+            1e6 * exactTime, 1e6 * boundedTime, 100 * error, 1e6 * bfsTime, 2.0 * len(cells) ** 2 / 1e6)
+
+def benchmarkMacro(options):
+    """
+    The junction graph of every layout, and random walks of --steps forward
+    model calls with generatePacmanSuccessor against generateMacroSuccessor:
+    pacman moves per call and microseconds per call.
+    """
+    rounds = [0]
+    pacmanRound = pacman.GameState._pacmanRound
+    def countedRound(self, action):
+        rounds[0] += 1
+        return pacmanRound(self, action)
+    print '%-20s %9s %6s %9s %8s %10s %8s' % ('layout', 'junctions', 'edges', 'corridor', 'engine',
+                                             'moves/call', 'us/call')
+    pacman.GameState._pacmanRound = countedRound
+    try:
+        for name, lay in loadLayouts(options.layouts):
+            graph = lay.getJunctionGraph()
+            edges = sum([len(e) for e in graph.edges.values()]) / 2
+            initState = initialState(pacman.GameState, lay)
+            for engine in ['single', 'macro']:
+                random.seed(options.seed)
+                rounds[0] = 0
+                initState.getContext().currentIterations = sys.maxint
+                state = initState
+                start = time.time()
+                for i in range(options.steps):
+                    action = random.choice(state.getLegalPacmanActions() or [Directions.STOP])
+                    if engine == 'single':
+                        state = state.generatePacmanSuccessor(action)
+                    else:
+                        state = state.generateMacroSuccessor(action)
+                    if state.isWin() or state.isLose():
+                        state = initState
+                seconds = time.time() - start
+                print '%-20s %9d %6d %8.0f%% %8s %10.2f %8.0f' % (name, len(graph.junctions), edges,
+                    100 * graph.corridorFraction(), engine, rounds[0] / float(options.steps),
+                    1e6 * seconds / options.steps)
+    finally:
+        pacman.GameState._pacmanRound = pacmanRound
+
+def benchmarkAStar(options):
+    """
+    Plays AStarAgent (A* and weighted A* with weight 2) on the *Search
+    layouts among --layouts, with --steps forward model calls per move, and
+    prints the moves it took to eat every pellet, the nodes its searches
+    expanded and nodes expanded per second.
+    """
+    import pacmanAgents
+    print '%-20s %6s %6s %6s %10s %10s %10s' % ('layout', 'weight', 'result', 'moves', 'searches',
+                                               'expanded', 'nodes/s')
+    for name, lay in loadLayouts([n for n in options.layouts if n.endswith('Search')]):
+        for weight in [1, 2]:
+            random.seed(options.seed)
+            agent = pacmanAgents.AStarAgent(weight = weight)
+            state = playMoves(agent, initialState(pacman.GameState, lay), 1000, options.steps)
+            expanded = sum([e for e, seconds, complete in agent.searches])
+            seconds = sum([seconds for e, seconds, complete in agent.searches])
+            result = ['-', 'win'][state.isWin()] if not state.isLose() else 'loss'
+            print '%-20s %6d %6s %6d %10d %10d %10.0f' % (name, weight, result, len(agent.budgetUsed),
+                len(agent.searches), expanded, expanded / max(seconds, 1e-9))
+
+def benchmarkExpectimax(options):
+    """
+    Plays three games of at most 150 moves of ExpectimaxAgent against random
+    ghosts with --steps forward model calls per move, with and without the
+    transposition table and move ordering, and prints the plies searched
+    per move, pacman nodes expanded per second and the final scores.
+    """
+    import pacmanAgents
+    games = 3
+    print '%-20s %6s %9s %8s %8s %10s %6s' % ('layout', 'table', 'ordering', 'plies', 'nodes/s',
+                                            'avg score', 'wins')
+    for name, lay in loadLayouts(options.layouts):
+        for table, ordering in [(0, 0), (0, 1), (1, 0), (1, 1)]:
+            searches, scores, wins = [], [], 0
+            for game in range(games):
+                random.seed(options.seed + game)
+                agent = pacmanAgents.ExpectimaxAgent(table = table, ordering = ordering)
+                state = playMoves(agent, initialState(pacman.GameState, lay), 150, options.steps)
+                searches += agent.searches
+                scores.append(state.getScore())
+                wins += state.isWin()
+            plies = sum([depth for depth, expanded, seconds in searches]) / float(len(searches))
+            rate = sum([expanded for depth, expanded, seconds in searches]) / \
+                   max(sum([seconds for depth, expanded, seconds in searches]), 1e-9)
+            print '%-20s %6d %9d %8.2f %8.0f %10.1f %6d' % (name, table, ordering, plies, rate,
+                                                          sum(scores) / float(games), wins)
+
+def benchmarkTournament(options):
+    """
+    Games per second of 16 headless GreedyAgent games against random ghosts
+    with runGames on 1, 2, 4 and 8 worker processes (pacman.py --workers),
+    on each of --layouts.  The games are the same for every worker count.
+    """
+    import pacmanAgents, ghostAgents, textDisplay, util
+    games = 16
+    print '%-20s %8s %8s %10s %10s' % ('layout', 'workers', 'games', 'seconds', 'games/s')
+    for name, lay in loadLayouts(options.layouts):
+        ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(lay.getNumGhosts())]
+        for workers in [1, 2, 4, 8]:
+            random.seed(options.seed)
+            util.mutePrint()
+            start = time.time()
+            pacman.runGames(lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), games,
+                            workers = workers, iterations = options.steps)
+            seconds = time.time() - start
+            util.unmutePrint()
+            print '%-20s %8d %8d %10.2f %10.1f' % (name, workers, games, seconds, games / seconds)
+
+def benchmarkConcurrent(options):
+    """
+    Plays 64 headless HillClimberAgent games against random ghosts at once,
+    each in a thread of this process with a forward model budget of its own
+    (10 to 80 calls per move), on each of --layouts.  Every decision's
+    forward model calls are checked against its own game's budget: 'over'
+    counts decisions that used more, 'exact' the ones that used their whole
+    budget (the hill climber stops only when the budget is spent).  Any
+    decision over budget fails the benchmark.
+    """
+    import pacmanAgents, ghostAgents, textDisplay, threading
+    from game import GameContext
+    games = 64
+    print '%-20s %6s %10s %8s %8s %8s %8s' % ('layout', 'games', 'decisions', 'over', 'exact',
+                                              'seconds', 'wins')
+    failed = []
+    for name, lay in loadLayouts(options.layouts):
+        random.seed(options.seed)
+        played = []
+        for i in range(games):
+            budget = 10 * (1 + i % 8)
+            agent = pacmanAgents.HillClimberAgent()
+            ghosts = [ghostAgents.RandomGhost(g + 1) for g in range(lay.getNumGhosts())]
+            rules = pacman.ClassicGameRules()
+            game = rules.newGame(lay, agent, ghosts, textDisplay.NullGraphics(), True, False,
+                                 GameContext(budget))
+            played.append((game, agent, budget))
+        threads = [threading.Thread(target = game.run) for game, agent, budget in played]
+        start = time.time()
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        seconds = time.time() - start
+        decisions = over = exact = wins = 0
+        for game, agent, budget in played:
+            for milliseconds, calls in agent.budgetUsed:
+                decisions += 1
+                over += calls > budget
+                exact += calls == budget
+            wins += game.state.isWin()
+        print '%-20s %6d %10d %8d %8d %8.2f %8d' % (name, games, decisions, over, exact, seconds, wins)
+        if over > 0: failed.append(name)
+    if len(failed) > 0:
+        raise Exception('decisions over their game\'s budget on ' + ', '.join(failed))
+
+class StallingAgent(Agent):
+    "Plays STOP, but on its fifth move busy-waits for the given milliseconds first."
+    def __init__(self, milliseconds, hostable = True):
+        Agent.__init__(self, 0)
+        self.milliseconds = milliseconds
+        self.hostable = hostable
+        self.moves = 0
+
+    def getAction(self, state):
+        self.moves += 1
+        if self.moves == 5:
+            end = time.time() + self.milliseconds / 1000.0
+            while time.time() < end: pass
+        return Directions.STOP
+
+def benchmarkTimeouts(options):
+    """
+    Move time limits under --catchExceptions.  First the cost of hosting the
+    agents in child processes: milliseconds per move of a GreedyAgent game
+    against random ghosts on each of --layouts, with agents in process (-c
+    off) and hosted (-c on).  Then a pacman that stalls for 200 ms on its
+    fifth move against a 50 ms --moveTimeout, played from the main thread
+    and from a worker thread, hosted and in process: 'stopped ms' is how
+    long the game lasted.  Only the in process agent in a worker thread
+    can't be interrupted and is caught after it returns.
+    """
+    import pacmanAgents, ghostAgents, textDisplay, threading, util
+    print '%-20s %8s %8s %10s' % ('layout', 'agents', 'moves', 'ms/move')
+    for name, lay in loadLayouts(options.layouts):
+        for mode, catchExceptions in [('process', False), ('hosted', True)]:
+            random.seed(options.seed)
+            ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(lay.getNumGhosts())]
+            rules = pacman.ClassicGameRules(30)
+            game = rules.newGame(lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), True,
+                                 catchExceptions)
+            start = time.time()
+            game.run()
+            seconds = time.time() - start
+            print '%-20s %8s %8d %10.2f' % (name, mode, len(game.moveHistory),
+                                            1000 * seconds / max(len(game.moveHistory), 1))
+    print
+    print '%-8s %8s %10s %10s' % ('thread', 'agents', 'timed out', 'stopped ms')
+    lay = layout.getLayout('testClassic')
+    for thread in ['main', 'worker']:
+        for mode, hostable in [('hosted', True), ('process', False)]:
+            rules = pacman.ClassicGameRules(30, moveTimeout = 0.05)
+            game = rules.newGame(lay, StallingAgent(200, hostable), [ghostAgents.RandomGhost(1)],
+                                 textDisplay.NullGraphics(), True, True)
+            util.mutePrint()
+            start = time.time()
+            if thread == 'main':
+                game.run()
+            else:
+                worker = threading.Thread(target = game.run)
+                worker.start()
+                worker.join()
+            util.unmutePrint()
+            print '%-8s %8s %10s %10.0f' % (thread, mode, game.agentTimeout, 1000 * (time.time() - start))
+
+def benchmarkTurns(options):
+    """
+    The cost of a turn in Game.run apart from the agents' thinking: headless
+    games of RandomAgent against random ghosts on each of --layouts, timed
+    per turn.  Then the observations on their own, over the same games:
+    a deep copy of the state, the GameStateView Game.run hands to pacman,
+    and how many distinct views a ghost got over all its observations (one
+    per game means no observation allocated anything).
+    """
+    import pacmanAgents, ghostAgents, textDisplay
+    from game import GameStateView
+    games = 5
+    print '%-20s %8s %10s %12s %10s %14s' % ('layout', 'turns', 'us/turn', 'us/deepCopy', 'us/view',
+                                             'ghost views')
+    for name, lay in loadLayouts(options.layouts):
+        random.seed(options.seed)
+        turns = 0
+        seconds = 0.0
+        played = []
+        for i in range(games):
+            ghosts = [ghostAgents.RandomGhost(g + 1) for g in range(lay.getNumGhosts())]
+            rules = pacman.ClassicGameRules(30)
+            game = rules.newGame(lay, pacmanAgents.RandomAgent(), ghosts, textDisplay.NullGraphics(), True)
+            start = time.time()
+            game.run()
+            seconds += time.time() - start
+            turns += len(game.moveHistory)
+            played.append(game)
+        timings = []
+        for observe in [lambda game: game.state.deepCopy(), lambda game: GameStateView(game.state)]:
+            start = time.time()
+            for i in range(turns):
+                observe(played[i % games])
+            timings.append(time.time() - start)
+        views = set([id(played[i % games]._observe(1)) for i in range(turns)])
+        print '%-20s %8d %10.1f %12.1f %10.1f %14d' % (name, turns, 1e6 * seconds / turns,
+                                                       1e6 * timings[0] / turns, 1e6 * timings[1] / turns,
+                                                       len(views))
+
+BENCHMARKS = {
+    'engines': benchmarkEngines,
+    'cow': benchmarkCopyOnWrite,
+    'hashing': benchmarkHashing,
+    'rollouts': benchmarkRollouts,
+    'vector': benchmarkVector,
+    'mcts': benchmarkMcts,
+    'reuse': benchmarkReuse,
+    'parallel': benchmarkParallel,
+    'trie': benchmarkTrie,
+    'genetic': benchmarkGenetic,
+    'rolling': benchmarkRolling,
+    'oracle': benchmarkOracle,
+    'macro': benchmarkMacro,
+    'astar': benchmarkAStar,
+    'expectimax': benchmarkExpectimax,
+    'tournament': benchmarkTournament,
+    'concurrent': benchmarkConcurrent,
+    'timeouts': benchmarkTimeouts,
+    'turns': benchmarkTurns,
+}
+
+def readCommand( argv ):
+    from optparse import OptionParser
+    parser = OptionParser(__doc__)
+    parser.add_option('--layouts', dest='layouts', default=None,
+                      help='Comma separated layout names [Default: every layout in layouts/]')
+    parser.add_option('--steps', dest='steps', type='int', default=2000,
+                      help='Forward model calls per measurement [Default: %default]')
+    parser.add_option('--depth', dest='depth', type='int', default=10,
+                      help='Rollout depth [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=188,
+                      help='Random seed [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 1 or otherjunk[0] not in BENCHMARKS:
+        parser.error('choose one benchmark of: ' + ', '.join(sorted(BENCHMARKS.keys())))
+    if options.layouts == None:
+        options.layouts = allLayoutNames()
+    else:
+        options.layouts = options.layouts.split(',')
+    return BENCHMARKS[otherjunk[0]], options
+
+if __name__ == '__main__':
+    benchmark, options = readCommand( sys.argv[1:] )
+    benchmark( options )
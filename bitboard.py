@@ -0,0 +1,529 @@
+# bitboard.py
+# -----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A drop-in replacement for pacman.GameState that keeps the dynamic part of the
+game in a handful of ints instead of Grids, lists and Configuration objects.
+
+  food, capsules:   one bit per cell, bit index = x * height + y (the same
+                    ordering Grid.packBits uses)
+  positions:        one int per agent, in half-cell units so that scared
+                    ghosts (which move at half speed) still fit:
+                    pos = (2x) * (2 * height) + 2y
+  directions:       one int per agent, an index into DIRECTIONS
+  timers:           one int per agent (scared timers)
+
+Successors share everything that did not change, so a pacman move that eats
+nothing allocates a new state object and two small tuples.  The rules are the
+ones in pacman.PacmanRules / pacman.GhostRules; with the same random seed
+both engines play exactly the same game.
+
+Select it with 'python pacman.py --engine bitboard'.
+"""
+
+from game import GameContext
+from game import GameStateData
+from game import AgentState
+from game import Configuration
+from game import Directions
+from game import Actions
+from game import Grid
+import pacman
+import random
+
+DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+DIRECTION_INDEX = dict([(d, i) for i, d in enumerate(DIRECTIONS)])
+STOP = DIRECTION_INDEX[Directions.STOP]
+
+def getBoard(layout):
+    """
+    Returns the Board of a layout.  It is built once and kept on the layout
+    (see Layout.getDerived), which every state on the board shares.
+    """
+    return layout.getDerived('bitboard', Board)
+
+class Board:
+    """
+    The static information a BitboardGameState needs: wall bits and move
+    tables for every cell of one layout.
+    """
+    def __init__(self, layout):
+        self.layout = layout
+        self.width = layout.width
+        self.height = layout.height
+        self.stride = 2 * self.height
+
+        walls = layout.walls
+        self.walls = 0
+        for x in range(self.width):
+            for y in range(self.height):
+                if walls[x][y]: self.walls |= 1 << self.cellIndex(x, y)
+
+        # Position deltas (in half-cell units) for a move at full and half speed
+        self.fullStep = [0] * len(DIRECTIONS)
+        self.halfStep = [0] * len(DIRECTIONS)
+        for d, direction in enumerate(DIRECTIONS):
+            dx, dy = Actions._directions[direction]
+            self.fullStep[d] = 2 * dx * self.stride + 2 * dy
+            self.halfStep[d] = dx * self.stride + dy
+
+        # Legal moves from every free cell, keyed by encoded position.  The
+        # action order matches Actions.getPossibleActions so that random
+        # choices over them match the classic engine.
+        self.pacmanActions = {}
+        self.ghostActions = {}
+        for x in range(self.width):
+            for y in range(self.height):
+                if walls[x][y]: continue
+                possible = []
+                for direction, (dx, dy) in Actions._directionsAsList:
+                    if not self._isWall(x + dx, y + dy): possible.append(direction)
+                pos = self.encode(x, y)
+                self.pacmanActions[pos] = tuple(possible)
+                for d, direction in enumerate(DIRECTIONS):
+                    ghostActions = [a for a in possible if a != Directions.STOP]
+                    reverse = Actions.reverseDirection(direction)
+                    if reverse in ghostActions and len(ghostActions) > 1:
+                        ghostActions.remove(reverse)
+                    self.ghostActions[pos * len(DIRECTIONS) + d] = tuple(ghostActions)
+
+    def _isWall(self, x, y):
+        if x < 0 or x >= self.width or y < 0 or y >= self.height: return True
+        return self.layout.walls[x][y]
+
+    def cellIndex(self, x, y):
+        return x * self.height + y
+
+    def cellPosition(self, index):
+        return index // self.height, index % self.height
+
+    def encode(self, x, y):
+        return int(2 * x + 0.5) * self.stride + int(2 * y + 0.5)
+
+    def decode(self, pos):
+        x2, y2 = divmod(pos, self.stride)
+        x = x2 >> 1 if x2 % 2 == 0 else x2 / 2.0
+        y = y2 >> 1 if y2 % 2 == 0 else y2 / 2.0
+        return (x, y)
+
+    def nearest(self, pos):
+        """
+        Returns the encoded nearest grid point (util.nearestPoint) and its
+        distance from pos in half-cell units.
+        """
+        x2, y2 = divmod(pos, self.stride)
+        nx, ny = (x2 + 1) >> 1, (y2 + 1) >> 1
+        return 2 * nx * self.stride + 2 * ny, abs(x2 - 2 * nx) + abs(y2 - 2 * ny)
+
+    def halfDistance(self, pos1, pos2):
+        x1, y1 = divmod(pos1, self.stride)
+        x2, y2 = divmod(pos2, self.stride)
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    def bitsToPositions(self, bits):
+        positions = []
+        while bits:
+            low = bits & -bits
+            positions.append(self.cellPosition(low.bit_length() - 1))
+            bits ^= low
+        return positions
+
+# Collisions and eating are decided on half-cell distances
+_COLLISION_HALF_CELLS = int(2 * pacman.COLLISION_TOLERANCE)
+
+class BitboardGameState(object):
+    """
+    A GameState backed by integer bitboards.  It offers the same accessor
+    methods as pacman.GameState; the 'data' attribute is built on demand for
+    the displays, which read GameStateData fields directly.
+    """
+    __slots__ = ('board', 'food', 'capsules', 'positions', 'directions', 'timers', 'starts',
+                 'score', 'scoreChange', 'win', 'lose', 'eaten', 'foodEaten', 'capsuleEaten',
+                 'agentMoved', 'context', '_data', '_foodGrid')
+
+    ####################################################
+    # Accessor methods: use these to access state data #
+    ####################################################
+    def getLegalActions( self, agentIndex=0 ):
+        """
+        Returns the legal actions for the agent specified.
+        """
+        if self.win or self.lose: return []
+        if agentIndex == 0:
+            return list(self._pacmanActions())
+        else:
+            return list(self._ghostActions(agentIndex))
+
+    def generateSuccessor( self, agentIndex, action ):
+        """
+        Returns the successor state after the specified agent takes the action.
+        """
+        if self.win or self.lose: raise Exception('Can\'t generate a successor of a terminal state.')
+
+        state = self._successor()
+        if agentIndex == 0:
+            state.eaten = (False,) * len(self.positions)
+            state._applyPacmanAction(action)
+            state.scoreChange += -pacman.TIME_PENALTY
+        else:
+            state._applyGhostAction(action, agentIndex)
+            state._decrementTimer(agentIndex)
+        state._checkDeath(agentIndex)
+
+        state.agentMoved = agentIndex
+        state.score += state.scoreChange
+        return state
+
+    def getLegalPacmanActions( self ):
+        actions = self.getLegalActions( 0 )
+        if Directions.STOP in actions: actions.remove(Directions.STOP)
+        return actions
+
+    def getAllPossibleActions( self ):
+        return [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+    def checkLegalAction( self, action ):
+        if action in self.getLegalActions(0):
+            return 1
+        return 0
+
+    def generatePacmanSuccessor( self, action ):
+        """
+        Generates the successor state after the specified pacman move, with
+        every ghost taking a random legal action.
+        """
+        if not self.checkLegalAction(action):
+            action = Directions.STOP
+        context = self.context
+        context.currentIterations -= 1
+        if context.currentIterations <= 0:
+            return None
+        newState = self.generateSuccessor(0, action)
+        for i in range(1, len(self.positions)):
+            actions = newState.getLegalActions(i)
+            if newState.win or newState.lose:
+                break
+            if len(actions) > 0:
+                newState = newState.generateSuccessor(i, actions[random.randint(0, len(actions) - 1)])
+            else:
+                newState = newState.generateSuccessor(i, Directions.STOP)
+        return newState
+
+    def getContext( self ):
+        return self.context
+
+    def getPacmanState( self ):
+        return self._agentState(0)
+
+    def getPacmanPosition( self ):
+        return self.board.decode(self.positions[0])
+
+    def getGhostStates( self ):
+        return [self._agentState(i) for i in range(1, len(self.positions))]
+
+    def getGhostState( self, agentIndex ):
+        if agentIndex == 0 or agentIndex >= self.getNumAgents():
+            raise Exception("Invalid index passed to getGhostState")
+        return self._agentState(agentIndex)
+
+    def getGhostPosition( self, agentIndex ):
+        if agentIndex == 0:
+            raise Exception("Pacman's index passed to getGhostPosition")
+        return self.board.decode(self.positions[agentIndex])
+
+    def getGhostPositions( self ):
+        return [self.board.decode(p) for p in self.positions[1:]]
+
+    def getNumAgents( self ):
+        return len( self.positions )
+
+    def getScore( self ):
+        return float(self.score)
+
+    def getCapsules( self ):
+        """
+        Returns a list of positions (x,y) of the remaining capsules.
+        """
+        return self.board.bitsToPositions(self.capsules)
+
+    def getNumFood( self ):
+        return bin(self.food).count('1')
+
+    def getFoodPositions( self ):
+        """
+        Returns the set of positions (x,y) that still hold food.
+        """
+        return set(self.board.bitsToPositions(self.food))
+
+    def getFood( self ):
+        """
+        Returns a Grid of boolean food indicator variables.  The Grid is built
+        on first use, cached and frozen (read only).
+        """
+        if self._foodGrid is None:
+            grid = Grid(self.board.width, self.board.height)
+            for x, y in self.board.bitsToPositions(self.food):
+                grid[x][y] = True
+            self._foodGrid = grid.freeze()
+        return self._foodGrid
+
+    def getWalls( self ):
+        return self.board.layout.walls
+
+    def getMazeDistance( self, pos1, pos2 ):
+        return self.board.layout.getMazeDistance(pos1, pos2)
+
+    def hasFood( self, x, y ):
+        return bool(self.food >> self.board.cellIndex(x, y) & 1)
+
+    def hasWall( self, x, y ):
+        return bool(self.board.walls >> self.board.cellIndex(x, y) & 1)
+
+    def isLose( self ):
+        return self.lose
+
+    def isWin( self ):
+        return self.win
+
+    #############################################
+    #             Helper methods:               #
+    # You shouldn't need to call these directly #
+    #############################################
+
+    def __init__( self, prevState = None ):
+        self._data = None
+        self._foodGrid = None
+        if prevState is not None:
+            self._copyFrom(prevState)
+            self.scoreChange = prevState.scoreChange
+            self.win, self.lose = prevState.win, prevState.lose
+            self.foodEaten = prevState.foodEaten
+            self.capsuleEaten = prevState.capsuleEaten
+            self.agentMoved = prevState.agentMoved
+            self._foodGrid = prevState._foodGrid
+
+    def _copyFrom( self, prevState ):
+        self.board = prevState.board
+        self.food = prevState.food
+        self.capsules = prevState.capsules
+        self.positions = prevState.positions
+        self.directions = prevState.directions
+        self.timers = prevState.timers
+        self.starts = prevState.starts
+        self.score = prevState.score
+        self.eaten = prevState.eaten
+        self.context = prevState.context
+
+    def _successor( self ):
+        state = BitboardGameState.__new__(BitboardGameState)
+        state._copyFrom(self)
+        state._data = None
+        state._foodGrid = self._foodGrid
+        state.scoreChange = 0
+        state.win = state.lose = False
+        state.foodEaten = state.capsuleEaten = state.agentMoved = None
+        return state
+
+    def deepCopy( self ):
+        # Nothing in a bitboard state is mutable, so a shallow copy is deep
+        return BitboardGameState(self)
+
+    def initialize( self, layout, numGhostAgents=1000, context=None ):
+        """
+        Creates an initial game state from a layout array (see layout.py).
+        """
+        if context == None: context = GameContext()
+        self.context = context
+        board = getBoard(layout)
+        self.board = board
+        self.food = 0
+        for x, y in layout.food.asList():
+            self.food |= 1 << board.cellIndex(x, y)
+        self.capsules = 0
+        for x, y in layout.capsules:
+            self.capsules |= 1 << board.cellIndex(x, y)
+
+        positions = []
+        numGhosts = 0
+        for isPacman, (x, y) in layout.agentPositions:
+            if not isPacman:
+                if numGhosts == numGhostAgents: continue # Max ghosts reached already
+                else: numGhosts += 1
+            positions.append(board.encode(x, y))
+        self.positions = tuple(positions)
+        self.starts = self.positions
+        self.directions = (STOP,) * len(positions)
+        self.timers = (0,) * len(positions)
+        self.eaten = (False,) * len(positions)
+        self.score = 0
+        self.scoreChange = 0
+        self.win = self.lose = False
+        self.foodEaten = self.capsuleEaten = self.agentMoved = None
+
+    def _pacmanActions( self ):
+        actions = self.board.pacmanActions.get(self.positions[0])
+        if actions is None: # In between grid points, all agents must continue straight
+            return (DIRECTIONS[self.directions[0]],)
+        return actions
+
+    def _ghostActions( self, agentIndex ):
+        pos, d = self.positions[agentIndex], self.directions[agentIndex]
+        actions = self.board.ghostActions.get(pos * len(DIRECTIONS) + d)
+        if actions is None:
+            if d == STOP: return ()
+            return (DIRECTIONS[d],)
+        return actions
+
+    def _setAgent( self, agentIndex, pos, d ):
+        positions = list(self.positions)
+        positions[agentIndex] = pos
+        self.positions = tuple(positions)
+        if d != self.directions[agentIndex]:
+            directions = list(self.directions)
+            directions[agentIndex] = d
+            self.directions = tuple(directions)
+
+    def _setTimer( self, agentIndex, timer ):
+        timers = list(self.timers)
+        timers[agentIndex] = timer
+        self.timers = tuple(timers)
+
+    def _applyPacmanAction( self, action ):
+        if action not in self._pacmanActions():
+            action = Directions.STOP
+        d = DIRECTION_INDEX[action]
+        if d != STOP:
+            self._setAgent(0, self.positions[0] + self.board.fullStep[d], d)
+
+        nearest, distance = self.board.nearest(self.positions[0])
+        if distance <= 1:
+            self._consume(nearest)
+
+    def _consume( self, pos ):
+        board = self.board
+        position = board.decode(pos)
+        bit = 1 << board.cellIndex(*position)
+        # Eat food
+        if self.food & bit:
+            self.scoreChange += 10
+            self.food &= ~bit
+            self._foodGrid = None
+            self.foodEaten = position
+            if self.food == 0 and not self.lose:
+                self.scoreChange += 500
+                self.win = True
+        # Eat capsule
+        if self.capsules & bit:
+            self.capsules &= ~bit
+            self.capsuleEaten = position
+            # Reset all ghosts' scared timers
+            self.timers = self.timers[:1] + (pacman.SCARED_TIME,) * (len(self.timers) - 1)
+
+    def _applyGhostAction( self, action, agentIndex ):
+        if action not in self._ghostActions(agentIndex):
+            raise Exception("Illegal ghost action " + str(action))
+        d = DIRECTION_INDEX[action]
+        if self.timers[agentIndex] > 0:
+            step = self.board.halfStep[d]
+        else:
+            step = self.board.fullStep[d]
+        if d == STOP: d = self.directions[agentIndex] # There is no stop direction
+        self._setAgent(agentIndex, self.positions[agentIndex] + step, d)
+
+    def _decrementTimer( self, agentIndex ):
+        timer = self.timers[agentIndex]
+        if timer == 0: return
+        if timer == 1:
+            nearest, distance = self.board.nearest(self.positions[agentIndex])
+            self._setAgent(agentIndex, nearest, self.directions[agentIndex])
+        self._setTimer(agentIndex, timer - 1)
+
+    def _checkDeath( self, agentIndex ):
+        if agentIndex == 0: # Pacman just moved; Anyone can kill him
+            ghosts = range(1, len(self.positions))
+        else:
+            ghosts = [agentIndex]
+        for index in ghosts:
+            if self.board.halfDistance(self.positions[0], self.positions[index]) <= _COLLISION_HALF_CELLS:
+                self._collide(index)
+
+    def _collide( self, agentIndex ):
+        if self.timers[agentIndex] > 0:
+            self.scoreChange += 200
+            self._setAgent(agentIndex, self.starts[agentIndex], STOP)
+            self._setTimer(agentIndex, 0)
+            eaten = list(self.eaten)
+            eaten[agentIndex] = True
+            self.eaten = tuple(eaten)
+        else:
+            if not self.win:
+                self.scoreChange -= 500
+                self.lose = True
+
+    def _agentState( self, agentIndex ):
+        board = self.board
+        start = Configuration(board.decode(self.starts[agentIndex]), Directions.STOP)
+        agentState = AgentState(start, agentIndex == 0)
+        agentState.configuration = Configuration(board.decode(self.positions[agentIndex]),
+                                                 DIRECTIONS[self.directions[agentIndex]])
+        agentState.scaredTimer = self.timers[agentIndex]
+        return agentState
+
+    def _getData( self ):
+        """
+        Builds an equivalent GameStateData for code (mainly the displays) that
+        reads state.data directly.
+        """
+        if self._data is None:
+            data = GameStateData()
+            data.food = self.getFood()
+            data.foodPositions = frozenset(self.getFoodPositions())
+            data.numFood = len(data.foodPositions)
+            data.capsules = self.getCapsules()
+            data.agentStates = [self._agentState(i) for i in range(len(self.positions))]
+            data.layout = self.board.layout
+            data.score = self.score
+            data.scoreChange = self.scoreChange
+            data._eaten = list(self.eaten)
+            data._foodEaten = self.foodEaten
+            data._capsuleEaten = self.capsuleEaten
+            data._agentMoved = self.agentMoved
+            data._win = self.win
+            data._lose = self.lose
+            data.context = self.context
+            data._ownsAll()
+            self._data = data
+        return self._data
+    data = property(_getData)
+
+    def _key( self ):
+        return (self.positions, self.directions, self.timers, self.food, self.capsules, self.score)
+
+    def __eq__( self, other ):
+        """
+        Allows two states to be compared.
+        """
+        return isinstance(other, BitboardGameState) and self._key() == other._key()
+
+    def __ne__( self, other ):
+        return not self == other
+
+    def __hash__( self ):
+        """
+        Allows states to be keys of dictionaries.
+        """
+        return hash( self._key() )
+
+    def __str__( self ):
+        return str( self.data )
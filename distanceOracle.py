@@ -0,0 +1,185 @@
+# distanceOracle.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Maze distances on boards too big for the all pairs table of mazeDistances.py.
+
+The oracle keeps a breadth first search distance array from a handful of
+landmark cells, picked far apart from each other, so its memory grows
+linearly with the board.  By the triangle inequality every landmark L gives
+
+  |d(L,a) - d(L,b)|  <=  d(a,b)  <=  d(L,a) + d(L,b)
+
+and a query is answered by A* guided by the best of those lower bounds (the
+ALT algorithm).  With epsilon > 0 the answer may be up to (1 + epsilon)
+times the true distance: the landmark upper bound is returned when it is
+close enough to the lower bound, and otherwise a weighted A* is run.
+
+  oracle = DistanceOracle(layout.walls, numLandmarks=8)
+  oracle.getDistance((1, 1), (997, 995))
+"""
+
+import array
+import heapq
+import random
+
+# Distance between cells that cannot reach each other
+UNREACHABLE = 2 ** 31 - 1
+
+class DistanceOracle:
+    """
+    Landmark distances over a wall Grid.  Cells are numbered x * height + y
+    (the order of Grid.data).
+    """
+    def __init__( self, walls, numLandmarks=8, epsilon=0.0, seed=0 ):
+        self.width = walls.width
+        self.height = walls.height
+        self.epsilon = epsilon
+        self.free = freeCells( walls )
+        self.landmarks = []
+        self.landmarkDistances = []
+        self._chooseLandmarks( numLandmarks, random.Random( seed ) )
+
+    def _chooseLandmarks( self, numLandmarks, rand ):
+        cells = [i for i in xrange( len( self.free ) ) if self.free[i]]
+        if len( cells ) == 0: return
+        # Start from the cell furthest from a random one, then keep adding the
+        # cell furthest from every landmark so far
+        distances = bfsDistances( self.free, self.height, rand.choice( cells ) )
+        closest = distances
+        for n in range( numLandmarks ):
+            landmark = max( xrange( len( closest ) ), key=closest.__getitem__ )
+            if closest[landmark] <= 0: break
+            distances = bfsDistances( self.free, self.height, landmark )
+            self.landmarks.append( landmark )
+            self.landmarkDistances.append( distances )
+            closest = array.array( 'i', [min( a, b ) for a, b in zip( closest, distances )] )
+
+    def memoryBytes( self ):
+        total = len( self.free )
+        for distances in self.landmarkDistances:
+            total += distances.itemsize * len( distances )
+        return total
+
+    def bounds( self, cell1, cell2 ):
+        """
+        Returns (lower, upper) landmark bounds on the distance between two
+        cell numbers; (0, UNREACHABLE) when no landmark sees either of them.
+        """
+        lower, upper = 0, UNREACHABLE
+        for distances in self.landmarkDistances:
+            d1, d2 = distances[cell1], distances[cell2]
+            if d1 < 0 or d2 < 0:
+                if d1 != d2: return UNREACHABLE, UNREACHABLE # different components
+                continue
+            if abs( d1 - d2 ) > lower: lower = abs( d1 - d2 )
+            if d1 + d2 < upper: upper = d1 + d2
+        return lower, upper
+
+    def getDistance( self, pos1, pos2 ):
+        """
+        The maze distance between two free grid cells, exact when epsilon is
+        0 and at most (1 + epsilon) times too long otherwise.  UNREACHABLE if
+        they are not connected.
+        """
+        source = int( pos1[0] ) * self.height + int( pos1[1] )
+        target = int( pos2[0] ) * self.height + int( pos2[1] )
+        lower, upper = self.bounds( source, target )
+        if lower == upper or upper <= ( 1 + self.epsilon ) * lower:
+            return upper
+        return self._search( source, target, 1 + self.epsilon )
+
+    def _heuristic( self, cell, targetDistances ):
+        best = 0
+        for distances, targetDistance in targetDistances:
+            d = distances[cell]
+            if d >= 0:
+                d = abs( d - targetDistance )
+                if d > best: best = d
+        return best
+
+    def _search( self, source, target, weight ):
+        free, height = self.free, self.height
+        targetDistances = [(distances, distances[target]) for distances in self.landmarkDistances
+                           if distances[target] >= 0]
+        costs = {source: 0}
+        heap = [(weight * self._heuristic( source, targetDistances ), 0, source)]
+        while len( heap ) > 0:
+            priority, cost, cell = heapq.heappop( heap )
+            if cell == target: return cost
+            if cost > costs[cell]: continue
+            for neighbor in neighbors( free, height, cell ):
+                if cost + 1 < costs.get( neighbor, UNREACHABLE ):
+                    costs[neighbor] = cost + 1
+                    heapq.heappush( heap, (cost + 1 + weight * self._heuristic( neighbor, targetDistances ),
+                                           cost + 1, neighbor) )
+        return UNREACHABLE
+
+def freeCells( walls ):
+    "A bytearray with a 1 for every free cell, numbered x * height + y."
+    free = bytearray( walls.width * walls.height )
+    i = 0
+    for column in walls.data:
+        for wall in column:
+            if not wall: free[i] = 1
+            i += 1
+    return free
+
+def neighbors( free, height, cell ):
+    y = cell % height
+    result = []
+    if y + 1 < height and free[cell + 1]: result.append( cell + 1 )
+    if y > 0 and free[cell - 1]: result.append( cell - 1 )
+    if cell + height < len( free ) and free[cell + height]: result.append( cell + height )
+    if cell >= height and free[cell - height]: result.append( cell - height )
+    return result
+
+def bfsDistances( free, height, source ):
+    "Distances from source to every cell (-1 for walls and unreachable cells)."
+    distances = array.array( 'i', [-1] ) * len( free )
+    distances[source] = 0
+    frontier = [source]
+    distance = 0
+    while len( frontier ) > 0:
+        distance += 1
+        nextFrontier = []
+        for cell in frontier:
+            for neighbor in neighbors( free, height, cell ):
+                if distances[neighbor] < 0:
+                    distances[neighbor] = distance
+                    nextFrontier.append( neighbor )
+        frontier = nextFrontier
+    return distances
+
+def bfsDistance( free, height, source, target ):
+    "Plain breadth first search for one distance, the oracle's baseline."
+    if source == target: return 0
+    seen = set( [source] )
+    frontier = [source]
+    distance = 0
+    while len( frontier ) > 0:
+        distance += 1
+        nextFrontier = []
+        for cell in frontier:
+            for neighbor in neighbors( free, height, cell ):
+                if neighbor == target: return distance
+                if neighbor not in seen:
+                    seen.add( neighbor )
+                    nextFrontier.append( neighbor )
+        frontier = nextFrontier
+    return UNREACHABLE
+
+def buildDistanceOracle( layout, numLandmarks=8, epsilon=0.0 ):
+    "Builds the DistanceOracle of a layout; Layout.getDistanceOracle keeps it with the layout."
+    return DistanceOracle( layout.walls, numLandmarks, epsilon )
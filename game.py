@@ -22,8 +22,10 @@
 
 from util import *
 import time, os
+import random
 import traceback
 import sys
+import agentProcess
 
 #######################
 # Parts worth reading #
@@ -183,6 +185,21 @@ class Grid:
     def __setitem__(self, key, item):
         self.data[key] = item
 
+    def freeze(self):
+        """
+        Makes the grid read-only (tuples instead of lists) and returns it.
+        Copies of a frozen grid are ordinary, writable grids.
+        """
+        self.data = tuple([tuple(column) for column in self.data])
+        return self
+
+    def frozenCopy(self):
+        "A read-only copy of the grid, or the grid itself when it is frozen."
+        if type(self.data) is tuple: return self
+        g = Grid(self.width, self.height)
+        g.data = tuple([tuple(column) for column in self.data])
+        return g
+
     def __str__(self):
         out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
         out.reverse()
@@ -190,6 +207,8 @@ class Grid:
 
     def __eq__(self, other):
         if other == None: return False
+        if type(self.data) is not type(other.data): # one of them is frozen
+            return map(list, self.data) == map(list, other.data)
         return self.data == other.data
 
     def __hash__(self):
@@ -205,12 +224,28 @@ class Grid:
 
     def copy(self):
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        if type(self.data) is tuple:
+            g.data = [list(x) for x in self.data]
+        else:
+            g.data = [x[:] for x in self.data]
         return g
 
     def deepCopy(self):
         return self.copy()
 
+    def frozenWith(self, x, y, value):
+        """
+        A frozen copy of this frozen grid with grid[x][y] set to value.  Only
+        column x is rebuilt; every other column is shared with this grid.
+        """
+        columns = list(self.data)
+        column = list(columns[x])
+        column[y] = value
+        columns[x] = tuple(column)
+        g = Grid(self.width, self.height)
+        g.data = tuple(columns)
+        return g
+
     def shallowCopy(self):
         g = Grid(self.width, self.height)
         g.data = self.data
@@ -368,21 +403,67 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
-class GameStateData:
+_ZOBRIST_KEYS = {}
+_ZOBRIST_SEED = 188
+
+def zobristKey( feature ):
+    """
+    Returns the random bitstring for a hashable state feature such as
+    ('food', x, y).  The key is drawn from a generator seeded with the
+    feature's hash, so it does not depend on the order features are first
+    seen: every thread and every process gets the same key, and equal
+    features ((1, 2) and (1.0, 2.0)) get equal keys.
     """
+    key = _ZOBRIST_KEYS.get( feature )
+    if key == None:
+        key = random.Random( hash( feature ) ^ _ZOBRIST_SEED ).getrandbits(62)
+        key = _ZOBRIST_KEYS.setdefault( feature, key )
+    return key
 
+class GameStateData:
+    """
+    A successor shares the food Grid, the capsule list, the agentStates list
+    and every AgentState with its predecessor.  Anything that changes is copied
+    on first write through mutableCapsules, mutableAgentState and mutableEaten,
+    so never assign into the shared structures directly.
+
+    Alongside the food Grid it keeps numFood and foodPositions, the set of
+    cells that still hold food, so counting and listing food never scans the
+    board.  The Grid is always frozen and foodPositions is a frozenset:
+    removeFood replaces them (rebuilding one column of the Grid), so read-only
+    views can hand them out without copying.
+
+    The state also carries a Zobrist hash of its agents, food and capsules.
+    removeFood, removeCapsule, setAgentConfiguration and setScaredTimer keep
+    it up to date as the rules change the state, so hashing is O(1).
     """
+    # Set to False to copy every substructure eagerly (the old behaviour)
+    copyOnWrite = True
+
     def __init__( self, prevState = None ):
         """
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
             self.layout = prevState.layout
-            self._eaten = prevState._eaten
+            self.context = prevState.context
             self.score = prevState.score
+            self._zobrist = prevState._zobrist
+            self.numFood = prevState.numFood
+            self.foodPositions = prevState.foodPositions
+            if GameStateData.copyOnWrite:
+                self.food = prevState.food
+                self.capsules = prevState.capsules
+                self.agentStates = prevState.agentStates
+                self._eaten = prevState._eaten
+                self._ownsCapsules = self._ownsEaten = False
+                self._ownedAgentStates = None
+            else:
+                self.food = prevState.food.shallowCopy()
+                self.capsules = prevState.capsules[:]
+                self.agentStates = self.copyAgentStates( prevState.agentStates )
+                self._eaten = prevState._eaten[:]
+                self._ownsAll()
 
         self._foodEaten = None
         self._foodAdded = None
@@ -391,11 +472,96 @@ class GameStateData:
         self._lose = False
         self._win = False
         self.scoreChange = 0
+        if prevState == None:
+            self._zobrist = None
+            self.context = None
+
+    def _ownsAll( self ):
+        self._ownsCapsules = self._ownsEaten = True
+        self._ownedAgentStates = [True for agentState in self.agentStates]
+
+    def mutableCapsules( self ):
+        """
+        Returns the capsule list, copying it first if it is shared.
+        """
+        if not self._ownsCapsules:
+            self.capsules = self.capsules[:]
+            self._ownsCapsules = True
+        return self.capsules
+
+    def mutableAgentState( self, index ):
+        """
+        Returns agentStates[index], copying it (and the agentStates list) first
+        if it is shared.
+        """
+        owned = self._ownedAgentStates
+        if owned == None:
+            self.agentStates = self.agentStates[:]
+            owned = self._ownedAgentStates = [False for agentState in self.agentStates]
+        if not owned[index]:
+            self.agentStates[index] = self.agentStates[index].copy()
+            owned[index] = True
+        return self.agentStates[index]
+
+    def mutableEaten( self ):
+        """
+        Returns the _eaten list, copying it first if it is shared.
+        """
+        if not self._ownsEaten:
+            self._eaten = self._eaten[:]
+            self._ownsEaten = True
+        return self._eaten
+
+    def removeFood( self, x, y ):
+        self.food = self.food.frozenWith( x, y, False )
+        self.foodPositions = self.foodPositions.difference( ((x, y),) )
+        self.numFood -= 1
+        if self._zobrist != None:
+            self._zobrist ^= zobristKey( ('food', x, y) )
+
+    def removeCapsule( self, position ):
+        self.mutableCapsules().remove( position )
+        if self._zobrist != None:
+            self._zobrist ^= zobristKey( ('capsule', position) )
+
+    def setAgentConfiguration( self, index, configuration ):
+        agentState = self.mutableAgentState( index )
+        if self._zobrist != None:
+            self._zobrist ^= self._configurationKey( index, agentState.configuration ) ^ \
+                             self._configurationKey( index, configuration )
+        agentState.configuration = configuration
+
+    def setScaredTimer( self, index, timer ):
+        agentState = self.mutableAgentState( index )
+        if self._zobrist != None:
+            self._zobrist ^= zobristKey( ('timer', index, agentState.scaredTimer) ) ^ \
+                             zobristKey( ('timer', index, timer) )
+        agentState.scaredTimer = timer
+
+    def _configurationKey( self, index, configuration ):
+        if configuration == None: return 0
+        return zobristKey( ('agent', index, configuration.pos, configuration.direction) )
+
+    def computeZobrist( self ):
+        """
+        Computes the Zobrist hash from scratch; O(width * height).
+        """
+        h = 0
+        for x, y in self.foodPositions:
+            h ^= zobristKey( ('food', x, y) )
+        for position in self.capsules:
+            h ^= zobristKey( ('capsule', position) )
+        for index, agentState in enumerate( self.agentStates ):
+            h ^= self._configurationKey( index, agentState.configuration )
+            h ^= zobristKey( ('timer', index, agentState.scaredTimer) )
+        return h
 
     def deepCopy( self ):
         state = GameStateData( self )
-        state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = self.copyAgentStates( self.agentStates )
+        state._eaten = self._eaten[:]
+        state._ownsAll()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -415,7 +581,8 @@ class GameStateData:
         if other == None: return False
         # TODO Check for type of other
         if not self.agentStates == other.agentStates: return False
-        if not self.food == other.food: return False
+        if not self.numFood == other.numFood: return False
+        if not self.foodPositions == other.foodPositions: return False
         if not self.capsules == other.capsules: return False
         if not self.score == other.score: return False
         return True
@@ -424,13 +591,9 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        if self._zobrist == None:
+            self._zobrist = self.computeZobrist()
+        return hash( (self._zobrist, self.score) )
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -484,13 +647,19 @@ class GameStateData:
             return '3'
         return 'E'
 
-    def initialize( self, layout, numGhostAgents ):
+    def initialize( self, layout, numGhostAgents, context=None ):
         """
         Creates an initial game state from a layout array (see layout.py).
+        Every state that follows from it shares context, a new GameContext
+        unless one is given.
         """
-        self.food = layout.food.copy()
+        if context == None: context = GameContext()
+        self.context = context
+        self.food = layout.food
+        self.foodPositions = frozenset( self.food.asList() )
+        self.numFood = len( self.foodPositions )
         #self.capsules = []
-        self.capsules = layout.capsules[:]
+        self.capsules = list( layout.capsules )
         self.layout = layout
         self.score = 0
         self.scoreChange = 0
@@ -503,6 +672,111 @@ class GameStateData:
                 else: numGhosts += 1
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
+        self._ownsAll()
+        self._zobrist = self.computeZobrist()
+
+class GameStateView(object):
+    """
+    A read-only window on a game state (GameState or BitboardGameState),
+    which Game.run hands to the agents as their observation instead of a
+    deep copy.  It shares storage with the game's own state: successors are
+    generated from the real state (they copy on write, see GameStateData),
+    the food Grid comes frozen, agent states and capsule lists are private
+    copies, and assigning to the view or to its data raises an Exception.
+    copy() returns an ordinary state to change at will.
+    """
+    __slots__ = ('_state',)
+
+    def __init__( self, state ):
+        object.__setattr__( self, '_state', state )
+
+    def _rebind( self, state ):
+        "Points the view at another state (for Game.run's reused views)."
+        object.__setattr__( self, '_state', state )
+
+    def copy( self ):
+        return self._state.deepCopy()
+
+    deepCopy = copy
+
+    def __getattr__( self, name ):
+        return getattr( self._state, name )
+
+    def __setattr__( self, name, value ):
+        raise Exception( 'A GameStateView is read-only; use copy() for a state to change' )
+
+    def _getData( self ):
+        return GameStateDataView( self._state.data )
+    data = property( _getData )
+
+    def getFood( self ):
+        return self._state.getFood().frozenCopy()
+
+    def getFoodPositions( self ):
+        return frozenset( self._state.getFoodPositions() )
+
+    def getCapsules( self ):
+        return list( self._state.getCapsules() )
+
+    def getGhostStates( self ):
+        return [agentState.copy() for agentState in self._state.getGhostStates()]
+
+    def getGhostState( self, agentIndex ):
+        return self._state.getGhostState( agentIndex ).copy()
+
+    def __eq__( self, other ):
+        if isinstance( other, GameStateView ): other = other._state
+        return self._state == other
+
+    def __ne__( self, other ):
+        return not self == other
+
+    def __hash__( self ):
+        return hash( self._state )
+
+    def __str__( self ):
+        return str( self._state )
+
+    def __reduce__( self ):
+        return ( GameStateView, ( self._state, ) )
+
+class GameStateDataView(object):
+    """
+    The read-only GameStateData of a GameStateView, with the same rules:
+    the food Grid comes frozen, foodPositions as a frozenset and the lists
+    (agentStates, capsules, _eaten) as private copies.
+    """
+    __slots__ = ('_data',)
+
+    def __init__( self, data ):
+        object.__setattr__( self, '_data', data )
+
+    def __getattr__( self, name ):
+        value = getattr( self._data, name )
+        if name == 'food': return value.frozenCopy()
+        if name == 'foodPositions': return frozenset( value )
+        if name == 'agentStates': return [agentState.copy() for agentState in value]
+        if name in ( 'capsules', '_eaten' ): return list( value )
+        return value
+
+    def __setattr__( self, name, value ):
+        raise Exception( 'A GameStateView is read-only; use copy() for a state to change' )
+
+    def __eq__( self, other ):
+        if isinstance( other, GameStateDataView ): other = other._data
+        return self._data == other
+
+    def __ne__( self, other ):
+        return not self == other
+
+    def __hash__( self ):
+        return hash( self._data )
+
+    def __str__( self ):
+        return str( self._data )
+
+    def __reduce__( self ):
+        return ( GameStateDataView, ( self._data, ) )
 
 try:
     import boinc
@@ -510,19 +784,43 @@ try:
 except:
     _BOINC_ENABLED = False
 
+class GameContext:
+    """
+    The settings and counters of one game, shared by every state of that
+    game (state.getContext()) so that games in the same process, or in
+    threads, don't interfere:
+
+      maxIterations        forward model calls pacman may make per move (-i)
+      currentIterations    calls left this move plus one; generatePacmanSuccessor
+                           returns None once it reaches 0
+      moveTime             milliseconds pacman may search per move (--moveTime)
+      moveDeadline         the util.Deadline of the current move
+      timeLimit            seconds the whole game may last
+      fileName             where to write pacman's moves at the end, if set
+    """
+    def __init__( self, maxIterations=1000, moveTime=None, timeLimit=30, fileName="" ):
+        self.maxIterations = maxIterations
+        self.currentIterations = maxIterations
+        self.moveTime = moveTime
+        self.moveDeadline = Deadline(None)
+        self.timeLimit = timeLimit
+        self.fileName = fileName
+        self.totalFoodAndCapsules = 0
+        self.movementHistory = []
+        self.notLossButTime = False
+
+    def startMove( self ):
+        "Refills the forward model budget and starts the move deadline."
+        self.currentIterations = self.maxIterations
+        self.moveDeadline = Deadline(self.moveTime)
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
     """
-    currentIterations=1000
-    maxIterations=1000
-    timeLimit=30
-    totalFoodAndCapsules=0
-    movementHistory=[]
-    notLossButTime = False
-    fileName=""
-
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, context=None ):
+        if context == None: context = GameContext()
+        self.context = context
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -535,6 +833,7 @@ class Game:
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
+        self.views = [None for agent in agents]
         import cStringIO
         self.agentOutput = [cStringIO.StringIO() for agent in agents]
 
@@ -573,11 +872,54 @@ class Game:
 
     def run( self ):
         """
-        Main control loop for game play.
+        Main control loop for game play.  With catchExceptions every agent
+        that can be is hosted in a child process (see agentProcess.py), which
+        is killed when a call overruns its time limit.
+        """
+        self.hosts = [None for agent in self.agents]
+        try:
+            if self.catchExceptions:
+                layout = self.state.data.layout
+                for i, agent in enumerate(self.agents):
+                    if agent and agentProcess.canHost(agent):
+                        self.hosts[i] = agentProcess.AgentProcess(agent, layout)
+            self._play()
+        finally:
+            for host in self.hosts:
+                if host != None: host.close()
+
+    def _timedCall( self, agentIndex, method, timeout, *args ):
+        """
+        Calls an agent method with a time limit in seconds (fractions work):
+        in the agent's process when it is hosted, and otherwise through
+        TimeoutFunction.
         """
+        host = self.hosts[agentIndex]
+        if host != None:
+            return host.call(method, timeout, *args)
+        return TimeoutFunction(getattr(self.agents[agentIndex], method), timeout)(*args)
+
+    def _observe( self, agentIndex ):
+        """
+        The agent's observation: a read-only GameStateView of the current
+        state.  Agents that declare keepsObservations = False (the built-in
+        ghosts) get the same view every turn, pointed at the new state, so
+        their observations cost no allocation at all.
+        """
+        if getattr( self.agents[agentIndex], 'keepsObservations', True ):
+            return GameStateView( self.state )
+        view = self.views[agentIndex]
+        if view is None:
+            view = self.views[agentIndex] = GameStateView( self.state )
+        else:
+            view._rebind( self.state )
+        return view
+
+    def _play( self ):
         self.display.initialize(self.state.data)
         self.numMoves = 0
-        Game.totalFoodAndCapsules = self.state.getNumFood() + len(self.state.getCapsules());
+        context = self.context
+        context.totalFoodAndCapsules = self.state.getNumFood() + len(self.state.getCapsules());
 
         ###self.display.initialize(self.state.makeObservation(1).data)
         # inform learning agents of the game start
@@ -595,10 +937,10 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
                         try:
                             start_time = time.time()
-                            timed_func(self.state.deepCopy())
+                            self._timedCall(i, 'registerInitialState', self.rules.getMaxStartupTime(i),
+                                            GameStateView(self.state))
                             time_taken = time.time() - start_time
                             self.totalAgentTimes[i] += time_taken
                         except TimeoutFunctionException:
@@ -612,7 +954,7 @@ class Game:
                         self.unmute()
                         return
                 else:
-                    agent.registerInitialState(self.state.deepCopy())
+                    agent.registerInitialState(GameStateView(self.state))
                 ## TODO: could this exceed the total time
                 self.unmute()
 
@@ -620,13 +962,14 @@ class Game:
         numAgents = len( self.agents )
         gameStart = time.time()
 
-        while (not self.gameOver) and (time.time()-gameStart < Game.timeLimit):
+        while (not self.gameOver) and (time.time()-gameStart < context.timeLimit):
             # Fetch the next agent
             agent = self.agents[agentIndex]
             move_time = 0
             skip_action = False
             # Generate an observation of the state
-            observation = self.state.deepCopy()
+            observation = self._observe(agentIndex)
+            if agentIndex == 0: context.startMove()
 
             # Solicit an action
             action = None
@@ -634,12 +977,12 @@ class Game:
 
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
                     try:
                         start_time = time.time()
                         if skip_action:
                             raise TimeoutFunctionException()
-                        action = timed_func( observation )
+                        action = self._timedCall(agentIndex, 'getAction',
+                                                 self.rules.getMoveTimeout(agentIndex) - move_time, observation)
                     except TimeoutFunctionException:
                         print >>sys.stderr, "Agent %d timed out on a single move!" % agentIndex
                         self.agentTimeout = True
@@ -698,18 +1041,17 @@ class Game:
             self.rules.process(self.state, self)
             # Track progress
             if agentIndex == numAgents + 1: self.numMoves += 1
-            if agentIndex == 0: Game.currentIterations = Game.maxIterations
             # Next agent
             agentIndex = ( agentIndex + 1 ) % numAgents
 
             if _BOINC_ENABLED:
                 boinc.set_fraction_done(self.getProgress())
 
-        Game.notLossButTime = time.time()-gameStart < Game.timeLimit
-        Game.movementHistory = [y[1] for x,y in enumerate(self.moveHistory) if y[0] == 0]
-        if len(Game.fileName) > 0:
-            f = open(Game.fileName, "w")
-            for a in Game.movementHistory:
+        context.notLossButTime = time.time()-gameStart < context.timeLimit
+        context.movementHistory = [y[1] for x,y in enumerate(self.moveHistory) if y[0] == 0]
+        if len(context.fileName) > 0:
+            f = open(context.fileName, "w")
+            for a in context.movementHistory:
                 f.write(a + "\n")
             f.close()
         # inform a learning agent of the game result
@@ -717,7 +1059,10 @@ class Game:
             if "final" in dir( agent ) :
                 try:
                     self.mute(agentIndex)
-                    agent.final( self.state )
+                    if self.hosts[agentIndex] != None:
+                        self.hosts[agentIndex].call('final', None, self.state)
+                    else:
+                        agent.final( self.state )
                     self.unmute()
                 except Exception,data:
                     if not self.catchExceptions: raise
@@ -16,10 +16,13 @@ from game import Agent
 from game import Actions
 from game import Directions
 import random
-from util import manhattanDistance
 import util
 
 class GhostAgent( Agent ):
+    # Only looks at its observation during getAction, so Game.run may reuse
+    # one GameStateView for all of them
+    keepsObservations = False
+
     def __init__( self, index ):
         self.index = index
 
@@ -64,7 +67,7 @@ class DirectionalGhost( GhostAgent ):
         pacmanPosition = state.getPacmanPosition()
 
         # Select best actions given the state
-        distancesToPacman = [manhattanDistance( pos, pacmanPosition ) for pos in newPositions]
+        distancesToPacman = [state.getMazeDistance( pos, pacmanPosition ) for pos in newPositions]
         if isScared:
             bestScore = max( distancesToPacman )
             bestProb = self.prob_scaredFlee
@@ -7,12 +7,30 @@ def normalizedScoreEvaluation(rootState, currentState):
     currentEval = scoreEvaluation(currentState);
     return (currentEval - rootEval) / 1000.0;
 
+# score with a small pull towards the closest pellet, for depth limited searches
+def foodDistanceEvaluation(state):
+    position = state.getPacmanPosition()
+    distances = [state.getMazeDistance(position, food) for food in state.getFoodPositions()]
+    return scoreEvaluation(state) - 0.1 * min([0] if len(distances) == 0 else distances);
+
 # heuristic (remaining cost) for A*
 def pelletsHeuristic(state):
     if state.isLose():
         return 1000.0;
-    return state.getNumFood() + len(self.state.getCapsules());
+    return state.getNumFood() + len(state.getCapsules());
 
-# current cost for A*
+# current cost for A*: pellets and capsules eaten since the start of the game
 def pelletsCost(state):
-    return Game.totalFoodAndCapsules - pelletsHeuristic(state);
+    layout = state.data.layout
+    return layout.totalFood + len(layout.capsules) - pelletsHeuristic(state);
+
+# admissible A* heuristics for the moves left to eat every pellet
+def foodCountHeuristic(state):
+    return state.getNumFood();
+
+def farthestFoodHeuristic(state):
+    position = state.getPacmanPosition()
+    return max([0] + [state.getMazeDistance(position, food) for food in state.getFoodPositions()]);
+
+def foodSearchHeuristic(state):
+    return max(foodCountHeuristic(state), farthestFoodHeuristic(state));
@@ -0,0 +1,83 @@
+# junctionGraph.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+The maze of a layout with its corridors collapsed.  Junctions are the free
+cells that do not have exactly two open neighbours (dead ends, forks and
+crossings); every corridor between two junctions becomes one weighted edge.
+Inside a corridor the only sensible moves are onwards or back, which is what
+GameState.generateMacroSuccessor uses to cross it in one forward model call:
+
+  graph = layout.getJunctionGraph()
+  graph.corridorPath((1, 3), Directions.NORTH)  # actions to the next junction
+  for action, junction, length in graph.edges[(1, 1)]: ...
+"""
+
+from game import Directions
+
+class JunctionGraph:
+    """
+    Built from the move tables of a layout.  edges[junction] lists
+    (action, junction reached, corridor length) for every way out of a
+    junction.
+    """
+    def __init__( self, layout ):
+        self.layout = layout
+        self.exits = {}
+        for cell in layout.walls.asList( False ):
+            actions = layout.getLegalActions( cell, Directions.STOP )
+            self.exits[cell] = tuple( [a for a in actions if a != Directions.STOP] )
+        self.junctions = set( [cell for cell, exits in self.exits.iteritems() if len( exits ) != 2] )
+        self.paths = {}
+        self.edges = {}
+        for junction in self.junctions:
+            edges = []
+            for action in self.exits[junction]:
+                path = self.corridorPath( junction, action )
+                edges.append( (action, self._end( junction, path ), len( path )) )
+            self.edges[junction] = edges
+
+    def isJunction( self, cell ):
+        return cell in self.junctions
+
+    def corridorPath( self, cell, action ):
+        """
+        The actions that move from cell through action and then along the
+        corridor until a junction (or cell itself, around a loop without
+        junctions) is reached.  Empty when action is not possible from cell.
+        """
+        key = (cell, action)
+        if key not in self.paths:
+            self.paths[key] = self._walk( cell, action )
+        return self.paths[key]
+
+    def _walk( self, start, action ):
+        if action not in self.exits.get( start, () ): return ()
+        path = [action]
+        cell = self.layout.getSuccessor( start, action )
+        while cell not in self.junctions and cell != start:
+            reverse = Directions.REVERSE[action]
+            action = [a for a in self.exits[cell] if a != reverse][0]
+            path.append( action )
+            cell = self.layout.getSuccessor( cell, action )
+        return tuple( path )
+
+    def _end( self, cell, path ):
+        for action in path:
+            cell = self.layout.getSuccessor( cell, action )
+        return cell
+
+    def corridorFraction( self ):
+        "The fraction of free cells that are not junctions."
+        return 1 - len( self.junctions ) / float( max( 1, len( self.exits ) ) )
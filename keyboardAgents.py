@@ -20,6 +20,9 @@ class KeyboardAgent(Agent):
     """
     An agent controlled by the keyboard.
     """
+    # reads the display's key events, so it can't run in an agentProcess
+    hostable = False
+
     # NOTE: Arrow keys also work.
     WEST_KEY  = 'a'
     EAST_KEY  = 'd'
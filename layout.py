@@ -14,14 +14,55 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import Directions
+from game import Actions
+import mazeDistances
+import distanceOracle
+import junctionGraph
 import os
 import random
 
 VISIBILITY_MATRIX_CACHE = {}
 
+def _buildMoveTables():
+    """
+    The moves of a free cell only depend on which of its neighbours are free:
+    bit i of its move mask is set when the i-th direction of
+    Actions._directionsAsList (STOP included) leads to a free cell.  For
+    every mask this returns the legal actions, in the order
+    Actions.getPossibleActions gives them, and per direction of travel the
+    actions a ghost may take (no stopping, no turning back but in dead ends).
+    """
+    legalActions, ghostActions = [], []
+    for mask in range(1 << len(Actions._directionsAsList)):
+        possible = [direction for i, (direction, vector) in enumerate(Actions._directionsAsList) if mask & (1 << i)]
+        legalActions.append(tuple(possible))
+        ghost = {}
+        for direction in Directions.REVERSE:
+            actions = [a for a in possible if a != Directions.STOP]
+            reverse = Directions.REVERSE[direction]
+            if reverse in actions and len(actions) > 1:
+                actions.remove(reverse)
+            ghost[direction] = tuple(actions)
+        ghostActions.append(ghost)
+    return legalActions, ghostActions
+
+LEGAL_ACTIONS, GHOST_ACTIONS = _buildMoveTables()
+DIRECTION_BITS = dict([(direction, 1 << i) for i, (direction, vector) in enumerate(Actions._directionsAsList)])
+
+# Boards with more free cells than this answer maze distances from the
+# landmark oracle instead of the all pairs table.  The table grows with the
+# square of the free cells: about 0.3 s to build at 800 cells (41x41), 1.7 s
+# at 1900 and tens of seconds beyond, while the oracle builds in 0.02-0.2 s.
+MAZE_DISTANCE_TABLE_LIMIT = 1000
+
 class Layout:
     """
-    A Layout manages the static information about the game board.
+    A Layout manages the static information about the game board.  It is
+    immutable once built (frozen Grids, tuples), so every state of every
+    game on the board shares the one object and deepCopy returns it.  Tables
+    derived from the board (maze distances, the bitboard, ...) are kept on
+    the object too (see getDerived) and go away with it.
     """
 
     def __init__(self, layoutText):
@@ -33,9 +74,16 @@ class Layout:
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
-        self.layoutText = layoutText
+        self.layoutText = tuple(layoutText)
+        self.walls.freeze()
+        self.food.freeze()
+        self.capsules = tuple(self.capsules)
+        self.agentPositions = tuple(self.agentPositions)
         self.totalFood = len(self.food.asList())
+        self.numFreeCells = self.walls.count(False)
+        self._derived = {}
         # self.initializeVisibilityMatrix()
+        self.initializeMoveTables()
 
     def getNumGhosts(self):
         return self.numGhosts
@@ -61,6 +109,72 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def initializeMoveTables(self):
+        """
+        Computes the move mask of every cell (see _buildMoveTables), one byte
+        per cell at x * height + y, 0 for walls.  getLegalActions,
+        getLegalGhostActions and getSuccessor look their answers up from it.
+        """
+        width, height, walls = self.width, self.height, self.walls
+        masks = bytearray(width * height)
+        for x in range(width):
+            for y in range(height):
+                if walls[x][y]: continue
+                mask = 0
+                for direction, (dx, dy) in Actions._directionsAsList:
+                    nextx, nexty = x + dx, y + dy
+                    if 0 <= nextx < width and 0 <= nexty < height and not walls[nextx][nexty]:
+                        mask |= DIRECTION_BITS[direction]
+                masks[x * height + y] = mask
+        self.moveMasks = masks
+
+    def _moveMask(self, pos):
+        "The move mask of a grid point; 0 in between grid points and in walls."
+        x, y = pos
+        try:
+            return self.moveMasks[x * self.height + y]
+        except TypeError: # float coordinates (scared ghosts)
+            ix, iy = int(x), int(y)
+            if ix != x or iy != y: return 0
+            return self.moveMasks[ix * self.height + iy]
+
+    def getLegalActions(self, pos, direction):
+        """
+        Returns the tuple of actions possible from pos for an agent travelling
+        in direction (see Actions.getPossibleActions).
+        """
+        mask = self._moveMask(pos)
+        if mask == 0: # In between grid points, all agents must continue straight
+            return (direction,)
+        return LEGAL_ACTIONS[mask]
+
+    def getLegalGhostActions(self, pos, direction):
+        """
+        Returns the tuple of actions a ghost travelling in direction may take
+        from pos: no stopping, and no turning around except at dead ends.
+        """
+        mask = self._moveMask(pos)
+        if mask == 0: # In between grid points, all agents must continue straight
+            if direction == Directions.STOP: return ()
+            return (direction,)
+        return GHOST_ACTIONS[mask][direction]
+
+    def getSuccessor(self, pos, action):
+        """
+        The cell a whole-cell move with action leads to from the grid point
+        pos, or None when pos is not a grid point or the move is not legal.
+        """
+        x, y = pos
+        try:
+            mask = self.moveMasks[x * self.height + y]
+        except TypeError: # float coordinates (scared ghosts)
+            mask = self._moveMask(pos)
+            x, y = int(x), int(y)
+        if not mask & DIRECTION_BITS[action]:
+            return None
+        dx, dy = Actions._directions[action]
+        return (x + dx, y + dy)
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -79,9 +193,85 @@ class Layout:
 
     def getFurthestCorner(self, pacPos):
         poses = [(1,1), (1, self.height - 2), (self.width - 2, 1), (self.width - 2, self.height - 2)]
-        dist, pos = max([(manhattanDistance(p, pacPos), p) for p in poses])
+        free = [p for p in poses if not self.isWall(p)]
+        if len(free) == 0:
+            dist, pos = max([(manhattanDistance(p, pacPos), p) for p in poses])
+            return pos
+        dist, pos = max([(self.getMazeDistance(p, pacPos), p) for p in free])
         return pos
 
+    def getMazeDistances(self):
+        """
+        Returns the all pairs maze distance table of this layout (see
+        mazeDistances.py), searching the maze on first use.
+        """
+        return self.getDerived('mazeDistances', mazeDistances.buildMazeDistances)
+
+    def getMazeDistance(self, pos1, pos2):
+        """
+        The length of the shortest path through the maze between two
+        positions.  Positions in between grid points (scared ghosts) count
+        their distance to the neighbouring grid points.
+        """
+        getDistance = self.getDistanceFunction()
+        best = mazeDistances.UNREACHABLE
+        for cell1, offset1 in self._gridPoints(pos1):
+            for cell2, offset2 in self._gridPoints(pos2):
+                distance = getDistance(cell1, cell2) + offset1 + offset2
+                if distance < best: best = distance
+        return best
+
+    def getDistanceFunction(self):
+        """
+        Returns getDistance(cell1, cell2) for grid cells: the all pairs table
+        on boards with up to MAZE_DISTANCE_TABLE_LIMIT free cells, the exact
+        landmark oracle on bigger ones.
+        """
+        if self.numFreeCells > MAZE_DISTANCE_TABLE_LIMIT:
+            return self.getDistanceOracle().getDistance
+        return self.getMazeDistances().getDistance
+
+    def getDistanceOracle(self, numLandmarks=8, epsilon=0.0):
+        """
+        Returns a landmark distance oracle for this layout (see
+        distanceOracle.py), for boards too big for the all pairs table.
+        """
+        return self.getDerived(('distanceOracle', numLandmarks, epsilon), distanceOracle.buildDistanceOracle,
+                               numLandmarks, epsilon)
+
+    def getJunctionGraph(self):
+        """
+        Returns the maze with its corridors collapsed into weighted edges
+        between junctions (see junctionGraph.py).
+        """
+        return self.getDerived('junctionGraph', junctionGraph.JunctionGraph)
+
+    def getDerived(self, key, build, *args):
+        """
+        Returns build(self, *args), built on the first call for key and kept
+        on this layout from then on.  Every state of every game on the board
+        shares the layout, so derived tables live (and die) with it.
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = build(self, *args)
+        return value
+
+    def __getstate__(self):
+        # derived tables can be large; a process that unpickles the layout rebuilds them
+        state = self.__dict__.copy()
+        state['_derived'] = {}
+        return state
+
+    def _gridPoints(self, pos):
+        x, y = pos
+        ix, iy = int(x), int(y)
+        if ix == x and iy == y:
+            return [((ix, iy), 0)]
+        if ix != x:
+            return [((ix, iy), x - ix), ((ix + 1, iy), ix + 1 - x)]
+        return [((ix, iy), y - iy), ((ix, iy + 1), iy + 1 - y)]
+
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
         row, col = [int(x) for x in pacPos]
         return ghostPos in self.visibility[row][col][pacDirection]
@@ -90,7 +280,8 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        # Nothing in a layout can change, so it is never copied
+        return self
 
     def processLayoutText(self, layoutText):
         """
@@ -0,0 +1,143 @@
+# mazeDistances.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Exact maze distances between every pair of free cells of a layout.
+
+A breadth first search from every free cell fills a square uint16 table (a
+NumPy matrix, or an array('H') when NumPy is missing) indexed by cell ids.
+Tables are kept in memory per layout text and written to
+.mazeDistanceCache/<sha1 of the layout text>.dist, so each board is only
+searched once.  Use them through the layout:
+
+  layout.getMazeDistance((1, 1), (5, 3))
+"""
+
+from game import Actions
+import array
+import hashlib
+import os
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except ImportError:
+    _NUMPY_ENABLED = False
+
+# Distance between cells that cannot reach each other
+UNREACHABLE = 65535
+
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mazeDistanceCache')
+def buildMazeDistances( layout ):
+    """
+    Returns the MazeDistances of a layout, from the disk cache or by
+    searching the maze.  Layout.getMazeDistances keeps it with the layout.
+    """
+    key = '\n'.join( layout.layoutText )
+    return MazeDistances( layout.walls, hashlib.sha1( key ).hexdigest() )
+
+class MazeDistances:
+    """
+    The distance table of one wall grid.  cellIds maps every free (x,y) to
+    its row and column in the table.
+    """
+    def __init__( self, walls, cacheKey=None ):
+        self.walls = walls
+        self.cells = [(x, y) for x in range( walls.width ) for y in range( walls.height ) if not walls[x][y]]
+        self.cellIds = dict( [(cell, i) for i, cell in enumerate( self.cells )] )
+        self.size = len( self.cells )
+        self.table = None
+        if cacheKey != None:
+            self.table = self._load( cacheKey )
+        if self.table is None:
+            self.table = self._search()
+            if cacheKey != None:
+                self._save( cacheKey )
+
+    def getDistance( self, cell1, cell2 ):
+        """
+        The maze distance between two free grid cells (UNREACHABLE if they
+        are not connected).
+        """
+        return int( self.table[self.cellIds[cell1] * self.size + self.cellIds[cell2]] )
+
+    def _search( self ):
+        neighbors = []
+        for x, y in self.cells:
+            adjacent = []
+            for direction, (dx, dy) in Actions._directionsAsList:
+                cell = (x + dx, y + dy)
+                if cell != (x, y) and cell in self.cellIds:
+                    adjacent.append( self.cellIds[cell] )
+            neighbors.append( adjacent )
+
+        size = self.size
+        if _NUMPY_ENABLED:
+            table = numpy.empty( size * size, dtype=numpy.uint16 )
+        else:
+            table = array.array( 'H', [0] ) * ( size * size )
+        for source in range( size ):
+            distances = [UNREACHABLE] * size
+            distances[source] = 0
+            frontier = [source]
+            distance = 0
+            while len( frontier ) > 0:
+                distance += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbor in neighbors[cell]:
+                        if distances[neighbor] == UNREACHABLE:
+                            distances[neighbor] = distance
+                            nextFrontier.append( neighbor )
+                frontier = nextFrontier
+            table[source * size:( source + 1 ) * size] = self._row( distances )
+        return table
+
+    def _row( self, distances ):
+        if _NUMPY_ENABLED:
+            return numpy.array( distances, dtype=numpy.uint16 )
+        return array.array( 'H', distances )
+
+    def _path( self, cacheKey ):
+        return os.path.join( CACHE_DIRECTORY, cacheKey + '.dist' )
+
+    def _load( self, cacheKey ):
+        path = self._path( cacheKey )
+        if not os.path.exists( path ): return None
+        try:
+            if _NUMPY_ENABLED:
+                table = numpy.fromfile( path, dtype=numpy.uint16 )
+            else:
+                table = array.array( 'H' )
+                f = open( path, 'rb' )
+                try: table.fromstring( f.read() )
+                finally: f.close()
+        except (IOError, OSError, ValueError):
+            return None
+        if len( table ) != self.size * self.size: return None
+        return table
+
+    def _save( self, cacheKey ):
+        # The cache is only an optimization: a read-only checkout still works
+        try:
+            if not os.path.isdir( CACHE_DIRECTORY ):
+                os.makedirs( CACHE_DIRECTORY )
+            path = self._path( cacheKey )
+            temporary = '%s.%d' % ( path, os.getpid() )
+            f = open( temporary, 'wb' )
+            try: f.write( self.table.tostring() )
+            finally: f.close()
+            os.rename( temporary, path )
+        except (IOError, OSError):
+            pass
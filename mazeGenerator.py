@@ -0,0 +1,102 @@
+# mazeGenerator.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Generates random mazes in the layout file format, for stress testing agents
+on boards far bigger than the ones in layouts/.
+
+USAGE:      python mazeGenerator.py <options> > layouts/<name>.lay
+EXAMPLES:   python mazeGenerator.py --width 61 --height 41 --seed 3
+            python mazeGenerator.py --width 201 --height 201 --loops 0.2 --ghosts 4
+
+The maze is carved by a randomized depth first search on the odd cells, so
+every free cell is reachable; --loops knocks out that fraction of the
+remaining inner walls to add cycles.
+"""
+
+import random
+import sys
+
+def generateMazeText( width, height, seed=None, loops=0.0, numGhosts=2, food=0.3 ):
+    """
+    Returns the lines of a layout: a width x height maze (both made odd)
+    with pacman in the bottom left, the ghosts in the top right, food on the
+    given fraction of free cells and a capsule near each corner.
+    """
+    rand = random.Random( seed )
+    width = max( 5, width | 1 )
+    height = max( 5, height | 1 )
+    wall = [[True] * height for x in range( width )]
+
+    # Randomized depth first search over the odd cells
+    start = (1, 1)
+    wall[1][1] = False
+    stack = [start]
+    while len( stack ) > 0:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy, dx, dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                   if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and wall[x + dx][y + dy]]
+        if len( options ) == 0:
+            stack.pop()
+            continue
+        nx, ny, dx, dy = rand.choice( options )
+        wall[x + dx / 2][y + dy / 2] = False
+        wall[nx][ny] = False
+        stack.append( (nx, ny) )
+
+    # Extra openings between neighbouring cells make cycles
+    if loops > 0:
+        for x in range( 1, width - 1 ):
+            for y in range( 1, height - 1 ):
+                if wall[x][y] and (x + y) % 2 == 1 and rand.random() < loops:
+                    wall[x][y] = False
+
+    grid = [['%' if wall[x][y] else ' ' for x in range( width )] for y in range( height )]
+    free = [(x, y) for x in range( width ) for y in range( height ) if not wall[x][y]]
+    for x, y in free:
+        if rand.random() < food: grid[y][x] = '.'
+    corners = [(1, height - 2), (width - 2, 1), (1, 1), (width - 2, height - 2)]
+    for x, y in corners:
+        if not wall[x][y]: grid[y][x] = 'o'
+    grid[1][1] = 'P'
+    ghostCells = sorted( free, key=lambda (x, y): -(x + y) )[:numGhosts]
+    for x, y in ghostCells:
+        grid[y][x] = 'G'
+    # Layout text lists the top row first
+    return [''.join( row ) for row in reversed( grid )]
+
+def generateLayout( width, height, seed=None, loops=0.0, numGhosts=2, food=0.3 ):
+    import layout
+    return layout.Layout( generateMazeText( width, height, seed, loops, numGhosts, food ) )
+
+def readCommand( argv ):
+    from optparse import OptionParser
+    parser = OptionParser( __doc__ )
+    parser.add_option( '--width', dest='width', type='int', default=41, help='Maze width [Default: %default]' )
+    parser.add_option( '--height', dest='height', type='int', default=41, help='Maze height [Default: %default]' )
+    parser.add_option( '--seed', dest='seed', type='int', default=None, help='Random seed' )
+    parser.add_option( '--loops', dest='loops', type='float', default=0.0,
+                       help='Fraction of inner walls to remove [Default: %default]' )
+    parser.add_option( '--ghosts', dest='ghosts', type='int', default=2, help='Number of ghosts [Default: %default]' )
+    parser.add_option( '--food', dest='food', type='float', default=0.3,
+                       help='Fraction of free cells with food [Default: %default]' )
+    options, otherjunk = parser.parse_args( argv )
+    if len( otherjunk ) != 0:
+        raise Exception( 'Command line input not understood: ' + str( otherjunk ) )
+    return options
+
+if __name__ == '__main__':
+    options = readCommand( sys.argv[1:] )
+    print '\n'.join( generateMazeText( options.width, options.height, options.seed, options.loops,
+                                       options.ghosts, options.food ) )
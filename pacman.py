@@ -42,12 +42,14 @@ The keys are 'a', 's', 'd', and 'w' to move (or arrow keys).  Have fun!
 
 from game import GameStateData
 from game import Game
+from game import GameContext
 from game import Directions
 from game import Actions
+from game import Configuration
 from util import nearestPoint
 from util import manhattanDistance
 import util, layout
-import sys, types, time, random, os
+import sys, types, time, random, os, logging
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
@@ -79,9 +81,9 @@ class GameState:
         if self.isWin() or self.isLose(): return []
 
         if agentIndex == 0:  # Pacman is moving
-            return PacmanRules.getLegalActions( self )
+            return list( PacmanRules.getLegalActions( self ) )
         else:
-            return GhostRules.getLegalActions( self, agentIndex )
+            return list( GhostRules.getLegalActions( self, agentIndex ) )
 
     def generateSuccessor(self, agentIndex, action):
         """
@@ -96,6 +98,7 @@ class GameState:
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
             state.data._eaten = [False for i in range(state.getNumAgents())]
+            state.data._ownsEaten = True
             PacmanRules.applyAction( state, action )
         else:                # A ghost is moving
             GhostRules.applyAction( state, action, agentIndex )
@@ -103,8 +106,8 @@ class GameState:
         # Time passes
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
-        else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+        elif state.data.agentStates[agentIndex].scaredTimer > 0:
+            GhostRules.decrementTimer( state, agentIndex )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
@@ -129,14 +132,40 @@ class GameState:
         return 0;
 
     def generatePacmanSuccessor( self, action ):
-        if not self.checkLegalAction(action):
-            action = Directions.STOP;
-        Game.currentIterations -= 1
-        if Game.currentIterations <= 0:
+        # Illegal actions become STOP inside PacmanRules.applyAction
+        context = self.data.context
+        context.currentIterations -= 1
+        if context.currentIterations <= 0:
             return None
         """
         Generates the successor state after the specified pacman move
         """
+        return self._pacmanRound( action )
+
+    def generateMacroSuccessor( self, action ):
+        """
+        Moves pacman through action and on along its corridor to the next
+        junction of the layout (see Layout.getJunctionGraph) for a single
+        forward model call, with the ghosts moving after every step.  The
+        move stops early when the game ends, a capsule is eaten or pacman
+        collides with a scared ghost.  Illegal actions are a single STOP.
+        """
+        context = self.data.context
+        context.currentIterations -= 1
+        if context.currentIterations <= 0:
+            return None
+        path = self.data.layout.getJunctionGraph().corridorPath( self.getPacmanPosition(), action )
+        if len( path ) == 0: path = (action,)
+        numCapsules = len( self.data.capsules )
+        state = self
+        for step in path:
+            state = state._pacmanRound( step )
+            if state.isWin() or state.isLose(): break
+            if len( state.data.capsules ) != numCapsules or True in state.data._eaten: break
+        return state
+
+    def _pacmanRound( self, action ):
+        "Pacman's move followed by a random legal move of every ghost."
         newState = self.generateSuccessor(0, action)
         for i in range(1,self.getNumAgents()):
             actions = newState.getLegalActions(i)
@@ -189,7 +218,14 @@ class GameState:
         return self.data.capsules
 
     def getNumFood( self ):
-        return self.data.food.count()
+        return self.data.numFood
+
+    def getFoodPositions( self ):
+        """
+        Returns the set of positions (x,y) that still hold food.  The set is
+        shared with other states, so don't modify it.
+        """
+        return self.data.foodPositions
 
     def getFood(self):
         """
@@ -215,6 +251,20 @@ class GameState:
         """
         return self.data.layout.walls
 
+    def getMazeDistance(self, pos1, pos2):
+        """
+        Returns the length of the shortest path through the maze between two
+        positions (see Layout.getMazeDistance).
+        """
+        return self.data.layout.getMazeDistance(pos1, pos2)
+
+    def getContext(self):
+        """
+        Returns the GameContext of this state's game (in game.py): the
+        forward model budget and the move deadline.
+        """
+        return self.data.context
+
     def hasFood(self, x, y):
         return self.data.food[x][y]
 
@@ -240,6 +290,7 @@ class GameState:
             self.data = GameStateData(prevState.data)
         else:
             self.data = GameStateData()
+        self._hash = None
 
     def deepCopy( self ):
         state = GameState( self )
@@ -254,19 +305,22 @@ class GameState:
 
     def __hash__( self ):
         """
-        Allows states to be keys of dictionaries.
+        Allows states to be keys of dictionaries.  The hash is cached; states
+        are never changed once generateSuccessor has returned them.
         """
-        return hash( self.data )
+        if self._hash == None:
+            self._hash = hash( self.data )
+        return self._hash
 
     def __str__( self ):
 
         return str(self.data)
 
-    def initialize( self, layout, numGhostAgents=1000 ):
+    def initialize( self, layout, numGhostAgents=1000, context=None ):
         """
         Creates an initial game state from a layout array (see layout.py).
         """
-        self.data.initialize(layout, numGhostAgents)
+        self.data.initialize(layout, numGhostAgents, context)
 
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
@@ -283,14 +337,17 @@ class ClassicGameRules:
     These game rules manage the control flow of a game, deciding when
     and how the game starts and ends.
     """
-    def __init__(self, timeout=1):
+    def __init__(self, timeout=1, stateType=None, moveTimeout=None):
         self.timeout = timeout
+        self.moveTimeout = moveTimeout
+        if stateType == None: stateType = GameState
+        self.stateType = stateType
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, context=None):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
-        initState = GameState()
-        initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, context=context)
+        initState = self.stateType()
+        initState.initialize( layout, len(ghostAgents), game.context )
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -327,10 +384,11 @@ class ClassicGameRules:
         return self.timeout
 
     def getMoveWarningTime(self, agentIndex):
-        return self.timeout
+        return self.getMoveTimeout(agentIndex)
 
     def getMoveTimeout(self, agentIndex):
-        return self.timeout
+        if self.moveTimeout == None: return self.timeout
+        return self.moveTimeout
 
     def getMaxTimeWarnings(self, agentIndex):
         return 0
@@ -344,9 +402,10 @@ class PacmanRules:
 
     def getLegalActions( state ):
         """
-        Returns a list of possible actions.
+        Returns a tuple of possible actions.
         """
-        return Actions.getPossibleActions( state.getPacmanState().configuration, state.data.layout.walls )
+        conf = state.data.agentStates[0].configuration
+        return state.data.layout.getLegalActions( conf.pos, conf.direction )
     getLegalActions = staticmethod( getLegalActions )
 
     def applyAction( state, action ):
@@ -357,11 +416,11 @@ class PacmanRules:
         if action not in legal:
             action = Directions.STOP;
 
-        pacmanState = state.data.agentStates[0]
-
         # Update Configuration
-        vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
-        pacmanState.configuration = pacmanState.configuration.generateSuccessor( vector )
+        pacmanState = state.data.agentStates[0]
+        if action != Directions.STOP:
+            state.data.setAgentConfiguration( 0, moveConfiguration( state.data.layout, pacmanState.configuration, action, PacmanRules.PACMAN_SPEED ) )
+            pacmanState = state.data.agentStates[0]
 
         # Eat
         next = pacmanState.configuration.getPosition()
@@ -376,21 +435,18 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.removeFood( x, y )
             state.data._foodEaten = position
-            # TODO: cache numFood?
-            numFood = state.getNumFood()
-            if numFood == 0 and not state.data._lose:
+            if state.getNumFood() == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
         if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+            state.data.removeCapsule( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.setScaredTimer( index, SCARED_TIME )
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -404,13 +460,7 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState( ghostIndex ).configuration
-        possibleActions = Actions.getPossibleActions( conf, state.data.layout.walls )
-        reverse = Actions.reverseDirection( conf.direction )
-        if Directions.STOP in possibleActions:
-            possibleActions.remove( Directions.STOP )
-        if reverse in possibleActions and len( possibleActions ) > 1:
-            possibleActions.remove( reverse )
-        return possibleActions
+        return state.data.layout.getLegalGhostActions( conf.pos, conf.direction )
     getLegalActions = staticmethod( getLegalActions )
 
     def applyAction( state, action, ghostIndex):
@@ -422,15 +472,16 @@ class GhostRules:
         ghostState = state.data.agentStates[ghostIndex]
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
-        vector = Actions.directionToVector( action, speed )
-        ghostState.configuration = ghostState.configuration.generateSuccessor( vector )
+        state.data.setAgentConfiguration( ghostIndex, moveConfiguration( state.data.layout, ghostState.configuration, action, speed ) )
     applyAction = staticmethod( applyAction )
 
-    def decrementTimer( ghostState):
+    def decrementTimer( state, ghostIndex ):
+        ghostState = state.data.agentStates[ghostIndex]
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint( ghostState.configuration.pos )
-        ghostState.scaredTimer = max( 0, timer - 1 )
+            configuration = ghostState.configuration
+            state.data.setAgentConfiguration( ghostIndex, Configuration( nearestPoint( configuration.pos ), configuration.direction ) )
+        state.data.setScaredTimer( ghostIndex, max( 0, timer - 1 ) )
     decrementTimer = staticmethod( decrementTimer )
 
     def checkDeath( state, agentIndex):
@@ -451,10 +502,10 @@ class GhostRules:
     def collide( state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
-            GhostRules.placeGhost(state, ghostState)
-            ghostState.scaredTimer = 0
+            GhostRules.placeGhost(state, agentIndex)
+            state.data.setScaredTimer( agentIndex, 0 )
             # Added for first-person
-            state.data._eaten[agentIndex] = True
+            state.data.mutableEaten()[agentIndex] = True
         else:
             if not state.data._win:
                 state.data.scoreChange -= 500
@@ -465,10 +516,24 @@ class GhostRules:
         return manhattanDistance( ghostPosition, pacmanPosition ) <= COLLISION_TOLERANCE
     canKill = staticmethod( canKill )
 
-    def placeGhost(state, ghostState):
-        ghostState.configuration = ghostState.start
+    def placeGhost(state, ghostIndex):
+        state.data.setAgentConfiguration( ghostIndex, state.data.agentStates[ghostIndex].start )
     placeGhost = staticmethod( placeGhost )
 
+def moveConfiguration( layout, configuration, action, speed ):
+    """
+    Returns the configuration reached by taking action at the given speed.
+    Whole-cell moves from a grid point are looked up with
+    Layout.getSuccessor; anything else falls back to vector arithmetic.
+    """
+    if speed == 1:
+        next = layout.getSuccessor( configuration.pos, action )
+        if next != None:
+            if action == Directions.STOP: return Configuration( next, configuration.direction )
+            return Configuration( next, action )
+    vector = Actions.directionToVector( action, speed )
+    return configuration.generateSuccessor( vector )
+
 #############################
 # FRAMEWORK TO START A GAME #
 #############################
@@ -500,6 +565,8 @@ def readCommand( argv ):
                 (2) python pacman.py --layout smallClassic --zoom 2
                 OR  python pacman.py -l smallClassic -z 2
                     - starts an interactive game on a smaller board, zoomed in
+                (3) python pacman.py -p GreedyAgent -n 10000 --workers 8
+                    - plays 10000 headless games over 8 processes
     """
     parser = OptionParser(usageStr)
 
@@ -538,14 +605,28 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--moveTimeout', dest='moveTimeout', type='float',
+                      help='With -c, milliseconds after which a move is stopped and its agent loses (--moveTime is the limit pacman polls) [Default: --timeout seconds]', default=None)
     parser.add_option('-i', '--iterations', dest='iterations', type='int',
                       help=default('Maximum length of forward model steps'), default=500)
+    parser.add_option('--moveTime', dest='moveTime', type='float',
+                      help=default('Milliseconds pacman may search per move, on top of the forward model steps'), default=None)
+    parser.add_option('-e', '--engine', dest='engine',
+                      help=default('the GameState implementation to simulate with (classic or bitboard)'), default='classic')
+    parser.add_option('--workers', dest='workers', type='int',
+                      help=default('Worker processes to play the games on, headless, with a seed per game'), default=1)
+    parser.add_option('--logLevel', dest='logLevel', type='choice', choices=['debug', 'info', 'warning', 'error'],
+                      help=default('Agent diagnostics to print: debug, info (a line per move), warning or error'),
+                      default='warning')
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
         raise Exception('Command line input not understood: ' + str(otherjunk))
     args = dict()
 
+    # Agent diagnostics go through the logging module
+    util.configureLogging(getattr(logging, options.logLevel.upper()))
+
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
 
@@ -554,6 +635,7 @@ def readCommand( argv ):
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent
+    if options.workers > 1: options.quietGraphics = True
     noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
@@ -587,10 +669,12 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    if options.moveTimeout != None: args['moveTimeout'] = options.moveTimeout / 1000.0
+    args['stateType'] = loadEngine(options.engine)
+    args['workers'] = options.workers
 
-    Game.maxIterations = options.iterations
-    Game.currentIterations = Game.maxIterations
-    Game.timeLimit = options.timeout
+    args['iterations'] = options.iterations
+    args['moveTime'] = options.moveTime
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -628,6 +712,14 @@ def loadAgent(pacman, nographics):
                 return getattr(module, pacman)
     raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
 
+def loadEngine(engine):
+    if engine == 'classic':
+        return GameState
+    if engine == 'bitboard':
+        import bitboard
+        return bitboard.BitboardGameState
+    raise Exception('The engine ' + engine + ' is not one of classic, bitboard.')
+
 def replayGame( layout, actions, display ):
     import pacmanAgents, ghostAgents
     rules = ClassicGameRules()
@@ -646,11 +738,16 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record=False, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record=False, numTraining = 0, catchExceptions=False, timeout=30, stateType=None, workers=1, iterations=1000, moveTime=None, moveTimeout=None ):
+    if workers > 1:
+        if numTraining > 0: raise Exception('Training games need --workers 1')
+        return runTournament( layout, pacman, ghosts, numGames, workers, record, catchExceptions, timeout, stateType,
+                              iterations, moveTime, moveTimeout )
+
     import __main__
     __main__.__dict__['_display'] = display
 
-    rules = ClassicGameRules(timeout)
+    rules = ClassicGameRules(timeout, stateType, moveTimeout)
     games = []
 
     for i in range( numGames ):
@@ -663,29 +760,81 @@ def runGames( layout, pacman, ghosts, display, numGames, record=False, numTraini
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
+        context = GameContext( iterations, moveTime, timeout )
+        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, context )
         game.run()
         if not beQuiet: games.append(game)
 
-        if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+        if record: recordGame( layout, game, i )
 
     if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print 'Average Score:', sum(scores) / float(len(scores))
-        print 'Scores:       ', ', '.join([str(score) for score in scores])
-        print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+        printSummary( [game.state.getScore() for game in games], [game.state.isWin() for game in games] )
 
     return games
 
+def recordGame( layout, game, i ):
+    import time, cPickle
+    fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+    f = file(fname, 'w')
+    components = {'layout': layout, 'actions': game.moveHistory}
+    cPickle.dump(components, f)
+    f.close()
+
+def printSummary( scores, wins ):
+    winRate = wins.count(True)/ float(len(wins))
+    print 'Average Score:', sum(scores) / float(len(scores))
+    print 'Scores:       ', ', '.join([str(score) for score in scores])
+    print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
+    print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+
+def runTournament( layout, pacman, ghosts, numGames, workers, record=False, catchExceptions=False, timeout=30, stateType=None,
+                   iterations=1000, moveTime=None, moveTimeout=None ):
+    """
+    Plays numGames headless games over a pool of worker processes (--workers).
+    Each game gets its own random seed, drawn here, so a fixed seed (-f)
+    fixes the whole tournament.  Every worker unpickles its own copy of the
+    agents and game settings once; only (game number, seed)
+    goes out and (game number, score, win) comes back, as soon as a game
+    ends.  Prints the same summary as runGames and returns the (seed,
+    score, win) of every game in order.
+    """
+    import multiprocessing
+    seeds = [random.randint(0, sys.maxint) for i in range( numGames )]
+    settings = ( iterations, moveTime, timeout, moveTimeout, logging.getLogger().level )
+    pool = multiprocessing.Pool( workers, initTournamentWorker,
+                                 ( layout, pacman, ghosts, record, catchExceptions, stateType, settings ) )
+    results = [None] * numGames
+    try:
+        for i, score, win in pool.imap_unordered( playTournamentGame, enumerate( seeds ) ):
+            results[i] = ( seeds[i], score, win )
+    finally:
+        pool.close()
+        pool.join()
+    printSummary( [score for seed, score, win in results], [win for seed, score, win in results] )
+    return results
+
+# The agents and rules of the tournament this worker process plays
+_TOURNAMENT = None
+
+def initTournamentWorker( layout, pacman, ghosts, record, catchExceptions, stateType, settings ):
+    global _TOURNAMENT
+    iterations, moveTime, timeout, moveTimeout, logLevel = settings
+    util.configureLogging(logLevel)
+    _TOURNAMENT = ( layout, pacman, ghosts, record, catchExceptions, ClassicGameRules( timeout, stateType, moveTimeout ),
+                    ( iterations, moveTime, timeout ) )
+
+def playTournamentGame( task ):
+    i, seed = task
+    layout, pacman, ghosts, record, catchExceptions, rules, settings = _TOURNAMENT
+    import textDisplay
+    random.seed( seed )
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), False, catchExceptions,
+                          GameContext( *settings ) )
+    game.run()
+    if record: recordGame( layout, game, i )
+    sys.stdout.flush()
+    return i, game.state.getScore(), game.state.isWin()
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
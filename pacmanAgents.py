@@ -14,9 +14,23 @@
 
 from pacman import Directions
 from game import Agent
+from game import zobristKey
+from util import Deadline
 from heuristics import *
+from searchState import SearchState
+from sequenceTrie import SequenceEvaluator
+import vectorGA
+import ghostAgents
 import random
+import heapq
+import logging
 import math
+import sys
+import agentProcess
+import multiprocessing
+
+# Agent diagnostics: per move summaries at INFO, search internals at DEBUG (see --logLevel)
+log = logging.getLogger('pacmanAgents')
 
 class chromActionSequence:
     def __init__ (self, sequence):
@@ -25,41 +39,77 @@ class chromActionSequence:
         self.rank = 0
         self.selected = False     
 
-class mctsNode:
-    def __init__ (self, parent = None, score = float("-inf"), visited = False, prevAction = None, \
-                fullExpansion = False, visitCount = 0, terminal = False, exhausted = False):
+class mctsNode(object):
+    """
+    A node of the MCTS tree: the position reached by a line of pacman moves
+    and the ghost moves that answered them.  Children hang off their parent in
+    a dict keyed by (action, ghost outcome), so finding a child is a single
+    lookup however large the tree grows.  The visit count and total reward of
+    every tried action are kept on the node itself, since an action's result
+    is spread over all of the outcomes it led to.  untried holds the legal
+    actions with no statistics yet (None until the node is first reached).
+    """
+    __slots__ = ('parent', 'prevAction', 'outcome', 'children', 'untried', 'visitCount',
+                 'actionVisits', 'actionRewards')
+
+    def __init__ (self, parent = None, prevAction = None, outcome = None):
         self.parent = parent
-        self.score = score
         self.prevAction = prevAction
-        self.visited = visited
-        self.fullExpansion = fullExpansion
-        self.children = [ ]
-        self.visitCount = visitCount
-        self.terminal = terminal
-        self.exhausted = exhausted
-
-    def __eq__(self, anotherNode):
-        if (self.parent is anotherNode.parent) and (self.prevAction is anotherNode.prevAction):
-            return True
-        else:
-            return False  
+        self.outcome = outcome
+        self.children = {}
+        self.untried = None
+        self.visitCount = 0
+        self.actionVisits = {}
+        self.actionRewards = {}
 
 class UTCSearchTree:
+    """
+    The tree searched by UTCSearch.  The nodes themselves are linked through
+    mctsNode.children; the tree keeps the root and counts the nodes.
+    """
     def __init__ (self):
-        self.nodes = [ ]
-
-    def updateOrAddNode(self, mctsNode):
-        for i in range(0, len(self.nodes)):
-            if self.nodes[i] == mctsNode:
-                self.nodes[i] = mctsNode
-                return
-        self.nodes.append(mctsNode)
-    
-    def returnIndex(self, mctsNode):
-        for j in range(0, len(self.nodes)):
-            if self.nodes[j] == mctsNode:
-                return j
-        return -1
+        self.root = mctsNode()
+        self.size = 1
+
+    def addChild(self, node, action, outcome):
+        child = mctsNode(parent = node, prevAction = action, outcome = outcome)
+        node.children[(action, outcome)] = child
+        self.size += 1
+        return child
+
+    def reroot(self, action, outcome):
+        """
+        Makes the child reached by action and outcome the new root and drops
+        the rest of the tree.  Returns False, leaving an empty tree, when that
+        child was never visited.  The kept rewards need no adjusting, since
+        they don't depend on the root (see rolloutReward).
+        """
+        child = self.root.children.get((action, outcome))
+        if child is None:
+            self.__init__()
+            return False
+        child.parent = None
+        child.prevAction = child.outcome = None
+        self.root = child
+        self.size = 0
+        stack = [child]
+        while len(stack) > 0:
+            node = stack.pop()
+            self.size += 1
+            stack.extend(node.children.itervalues())
+        return True
+
+def ghostOutcome(state):
+    """
+    The ghost positions, directions and scared timers of a GameState or
+    SearchState, which together with pacman's moves identify a tree node.
+    """
+    if isinstance(state, SearchState):
+        return (tuple(state.positions[1:]), tuple(state.directions[1:]), tuple(state.timers[1:]))
+    ghosts = state.getGhostStates()
+    return (tuple([ghost.configuration.pos for ghost in ghosts]),
+            tuple([ghost.configuration.direction for ghost in ghosts]),
+            tuple([ghost.scaredTimer for ghost in ghosts]))
 
 class RandomAgent(Agent):
     # Initialization Function: Called one time when the game starts
@@ -127,262 +177,846 @@ class HillClimberAgent(Agent):
     sequences for the hill climber algorithm.  You have only one sequence with 5 actions. You return the one which 
     points you to the highest scoreEvaluation(state). Then, each action in the sequence has 50% chance to be changed 
     by random action.
+
+    3. The climb goes on until the forward model budget or the move deadline (--moveTime) runs out, and the
+    first action of the best sequence found so far is returned.
+
+    4. With -a rolling=1 the climb starts from last move's sequence, shifted by the action played and padded
+    with random actions, instead of from a fresh random sequence.
     """
+    def __init__(self, index = 0, rolling = 0):
+        Agent.__init__(self, index)
+        self.rolling = parseFlag(rolling)
 
     # Initialization Function: Called one time when the game starts
     def registerInitialState(self, state):
-        global finalSeq
-        finalSeq = []
+        self.sequence = []
+        self.budgetUsed = []
         return
 
     # GetAction Function: Called with every frame
     def getAction(self, state):
-        global finalSeq
-        randSeq = buildRandomSequence(state)
-        hillClimbSeq = hillClimbBuildNeighborSequence(state, randSeq)
-        hillClimbScore, hillClimbSeq = scoreAndTruncateActionSeq(state, hillClimbSeq)
-        randScore, randSeq = scoreAndTruncateActionSeq(state, randSeq)
-        if randScore > hillClimbScore:
-            finalSeq = randSeq
-            print('chose random sequence with score {}'.format(randScore))
+        context = state.getContext()
+        if self.rolling and len(self.sequence) > 0:
+            finalSeq = shiftSequence(state, self.sequence, 5)
         else:
-            finalSeq = hillClimbSeq
-            print('chose hillClimber sequence with score {}'.format(randScore))
-        #reverse list to pop actions
-        finalSeq.reverse()
-        print('executing action {} in list.'.format(finalSeq[len(finalSeq) - 1]))
-        nextAction = returnDirections(finalSeq.pop())
-        return (nextAction)
+            finalSeq = buildRandomSequence(state)
+        finalScore, finalSeq = scoreAndTruncateActionSeq(state, finalSeq)
+        while searchBudgetLeft(context):
+            hillClimbSeq = hillClimbBuildNeighborSequence(state, finalSeq[:])
+            hillClimbScore, hillClimbSeq = scoreAndTruncateActionSeq(state, hillClimbSeq)
+            if hillClimbScore is None:
+                break
+            if finalScore is None or hillClimbScore > finalScore:
+                finalScore, finalSeq = hillClimbScore, hillClimbSeq
+        self.sequence = finalSeq
+        log.info('chose sequence %s with score %s', finalSeq, finalScore)
+        recordBudget(self, context)
+        return returnDirections(finalSeq[0])
 
 class GeneticAgent(Agent):
+    """
+    Evolves a population of action sequences, one generation after another
+    until the forward model budget or the move deadline (--moveTime) runs
+    out, and plays the first action of the best sequence seen.  With
+    -a rolling=1 the next move starts from this move's population (and best
+    sequence), each shifted by the action played and padded with random
+    actions.
+    """
+    def __init__(self, index = 0, rolling = 0):
+        Agent.__init__(self, index)
+        self.rolling = parseFlag(rolling)
+
     # Initialization Function: Called one time when the game starts
     def registerInitialState(self, state):
+        self.budgetUsed = []
+        self.evaluator = SequenceEvaluator()
+        self.population = None
         return
 
     # GetAction Function: Called with every frame
     def getAction(self, state):
+        context = state.getContext()
         population = []
         popSize = 8
-        for i in range(0, popSize):
-            nextChrom = chromActionSequence(buildRandomSequence(state))
-            nextChrom.score, nextChrom.seq = scoreAndTruncateActionSeq(state, nextChrom.seq)
-            population.append(nextChrom)
-        print('after population creation it\'s is sized {}'.format(len(population))) 
-        #sorts from low to high
-        population.sort(key = lambda x: x.score)
-        for j in range(0, len(population)):
-            population[j].rank = j + 1
-        #need to cycle through whole population
-        printPopRanks(population)
-        while (countUnselectedPopMembers(population) > 1):
-            mom, dad = rankSelect(population)
-            #print('mom has rank {} and score {}, dad has rank {} and score {}'.format(mom.rank, mom.score, dad.rank, dad.score))
-            if random.random() <= 0.70 and ((mom or dad) is not None):
-                firstChild = crossover(mom, dad)
-                secondChild = crossover(mom, dad)
-                #print ('mom\'s sequence is {}'.format(mom.seq))
-                #print ('dad\'s sequence is {}'.format(dad.seq))
-                print('firstChild seq is {}'.format(firstChild.seq))
-                print('secondChild seq is {}'.format(secondChild.seq))
-                #find and remove mom, dad from chroms (population)
-                #return filter(lambda s: s[1] == value or s[2] == value, students)
-                #print('before filter population is sized {}'.format(len(population)))
-                #are there chances the same sequence exists elsewhere? 
-                population = filter(lambda x: ((x.seq is not mom.seq) and (x.seq is not dad.seq)), population)
-                #print('after filter population is {}'.format(population))
-                population.append(firstChild)
-                population.append(secondChild)
-                #print('after adding children population is sized {}'.format(len(population)))
-                #printPopRanks(population)
-                #print('after rankSelect call inside the crossover test. mom and dad are {} and {}, number of unselected chroms is {}'.format(mom, dad, countUnselectedPopMembers(population))) 
-            else:
-                #don't remove mom and dad, but find them in population and mark them selected
-                for chromosome in population:
-                    if mom.seq == chromosome.seq and mom.rank == chromosome.rank and mom.score == chromosome.score:
-                        #print('marking mom visited.')
-                        chromosome.selected = True
-                    elif dad.seq == chromosome.seq and dad.rank == chromosome.rank and dad.score == chromosome.score:
-                        chromosome.selected = True
-                        #print('marking dad visited.')
-                    else:
-                        continue
-                #print('ranks after marking parents as selected.')
-                #printPopRanks(population)
-        for k in range(0, len(population)):
-            if random.random() <= 0.10:
-                population[k] = mutateAction(population[k], state)
-        print('before return of direction...recomputing rank for population.')
-        for l in range(0, len(population)):
-            population[l].score, population[l].seq = scoreAndTruncateActionSeq(state, population[l].seq) 
+        self.evaluator.reset()
+        if self.rolling and self.population is not None:
+            for chrom in self.population:
+                population.append(chromActionSequence(shiftSequence(state, chrom.seq, 5)))
+        else:
+            for i in range(0, popSize):
+                population.append(chromActionSequence(buildRandomSequence(state)))
+        log.debug('after population creation it\'s is sized %d', len(population))
+        if not scorePopulation(state, population, self.evaluator):
+            recordBudget(self, context)
+            self.population = None
+            return random.choice(state.getLegalPacmanActions())
+        best = keepBest(None, population)
+        while searchBudgetLeft(context):
+            nextPopulation = evolvePopulation(population, state, self.evaluator)
+            if nextPopulation is None:
+                break
+            population = nextPopulation
+            best = keepBest(best, population)
+        # carry the best sequence over in place of the weakest one
         population.sort(key = lambda x: x.score)
-        for m in range(0, len(population)):
-            population[m].rank = m + 1
-        print('ranks after recompute.')
-        printPopRanks(population)
-        return (returnDirections(population[len(population) - 1].seq[0]))
+        population[0] = best
+        self.population = population
+        log.info('%s', self.evaluator)
+        recordBudget(self, context)
+        return (returnDirections(best.seq[0]))
+
+class VectorGeneticAgent(Agent):
+    """
+    The genetic search of GeneticAgent on a NumPy population matrix
+    (vectorGA), for populations of thousands, e.g.
+    python pacman.py -p VectorGeneticAgent -a popSize=2048,seqLength=8
+    rolling=1 carries the population over between moves as GeneticAgent does.
+    Requires numpy.
+    """
+    def __init__(self, index = 0, popSize = 256, seqLength = 5, rolling = 0):
+        Agent.__init__(self, index)
+        if not vectorGA._NUMPY_ENABLED:
+            raise Exception('VectorGeneticAgent requires numpy')
+        self.popSize = int(popSize)
+        self.seqLength = int(seqLength)
+        self.rolling = parseFlag(rolling)
 
-class MCTSAgent(Agent):
     # Initialization Function: Called one time when the game starts
     def registerInitialState(self, state):
+        self.budgetUsed = []
+        self.evaluator = SequenceEvaluator()
+        self.population = None
         return
 
     # GetAction Function: Called with every frame
     def getAction(self, state):
-        global searchTree
-        searchTree = UTCSearchTree()
-        bestChildAction = UTCSearch(state)
-        print('UTCSearch returned {}'.format(bestChildAction))
-        return returnDirections(bestChildAction)
-
-def UTCSearch(rootState):
-    global searchTree
-    rootNode = mctsNode(visitCount = 1)
-    currentState = rootState
-    legalActions = currentState.getLegalPacmanActions()
-    for action in legalActions:
-        childNode = mctsNode(parent = rootNode, prevAction = action, visitCount = 1)
-        childState = rootState.generatePacmanSuccessor(action)
-        searchTree.updateOrAddNode(childNode) 
-        rootNode.children.append(childNode)
-    rootNode.fullExpansion = True
-    searchTree.updateOrAddNode(rootNode)
-    lastNode, lastState = treePolicy(rootNode, currentState)
-    terminalStateReward = normalizedScoreEvaluation(rootState, defaultPolicy(lastState))
-    #backup
-    backup(lastNode, lastState, rootState, terminalStateReward)
-    print('looking for node with most visits....tree is size {}.'.format(len(searchTree.nodes)))
-    searchTree.nodes.sort(key=lambda x: x.visitCount, reverse=True)
-    bCount = 0
-    #print('the list of searchTree nodes with visitCount sort: ')
-    for k in range(0, len(searchTree.nodes)):
-        if searchTree.nodes[k].visitCount > bCount:
-            bKey = k
-            bCount = searchTree.nodes[k].visitCount
-    #here we return the action which resulted in the "best child"
-    #constant down to 0 for this one to remove second term
-    currentNode = searchTree.nodes[k]
-    lastAction = currentNode.prevAction
-    print('after sort the currentNode is {} and has prevAction as {}'.format(currentNode, lastAction))
-    while currentNode.parent is not None:
-        lastAction = currentNode.prevAction
-        currentNode = currentNode.parent
-    print('found the lastAction as {} and the last node has a parent of {}'.format(lastAction, currentNode.parent))
-    return lastAction
-
-def treePolicy(node, state):
-    global searchTree
-    currentState = state
-    print('inside tree policy node has {} children.'.format(len(node.children)))
-    while isNotTerminal(currentState):
-        if not node.fullExpansion and not node.exhausted:
-            node = expand(node, currentState)
+        context = state.getContext()
+        self.evaluator.reset()
+        if self.rolling and self.population is not None:
+            population = self.population
+            population.shift()
         else:
-            #constant of 1 as given by assignment document
-            constant = 1
-            bcNode, bcState = bestChild(node, currentState, constant)
-            if (bcNode and bcState) is not None:
-                currentState = bcState
-                node = bcNode
-                searchTree.updateOrAddNode(node)
-            else:
+            population = vectorGA.Population(self.popSize, self.seqLength, random.randint(0, 2 ** 31 - 1))
+        self.population = None
+        if not population.evaluate(state, self.evaluator):
+            recordBudget(self, context)
+            return random.choice(state.getLegalPacmanActions())
+        best = population.best()
+        generations = 0
+        while searchBudgetLeft(context):
+            genes = population.genes
+            population.evolve()
+            if not population.evaluate(state, self.evaluator):
+                population.genes = genes
                 break
-    return(node, currentState)                
-
-def expand(node, currentState):
-    global searchTree
-    legalActions = currentState.getLegalPacmanActions()
-    for action in legalActions:
-        childNode = mctsNode(parent = node, prevAction = action, visitCount = 1)
-        childState = currentState.generatePacmanSuccessor(action)
-        if childState is not None:
-            if childState.isWin() or childState.isLose():
-                childNode.terminal = True
-            searchTree.updateOrAddNode(childNode)
-            node.children.append(childNode)
-            print('expanding child...')
-        #returning a node that has all of its children added
-    if childState is not None:
-        node.fullExpansion = True
-    elif childState is None:
-        node.exhausted = True
-    return(node)
-
-def bestChild(node, currentState, constant):
-    global searchTree
-    #not sure what value to initialize here...
-    max = float("-inf")
-    if node is not None:
-        print('{} children in best child.'.format(len(node.children)))
-        if len(node.children) == 1:
-            bChild = node.children[0]
-            bcState = currentState.generatePacmanSuccessor(node.children[0].prevAction)
-            return (bChild, bcState)
-    for child in node.children:
-        #constant of 1 as given in the instructions
-        cScore, cState = childScore(child, node, currentState, 1)
-        if cState is not None:
-            child.score = cScore
-            searchTree.updateOrAddNode(child)
-            print('cScore and cState type are {} and {}'.format(cScore, type(cState)))
-            if cScore >= max:
-                print('assigning bChild...')
-                max = cScore
-                bChild = child
-                bcState = cState
+            generations += 1
+            best = max(best, population.best(), key = lambda result: result[1])
+        population.keep(best[0])
+        self.population = population
+        sequence, score, truncation = best
+        sequence = truncateSequence(state, sequence, truncation)
+        log.info('%d generations, best sequence %s with score %s', generations, sequence, score)
+        log.info('%s', self.evaluator)
+        recordBudget(self, context)
+        return returnDirections(sequence[0])
+
+def keepBest(best, population):
+    """
+    Returns a copy of the highest scoring chromosome of population if it beats
+    best (children share and mutate their parents' sequences, so the
+    sequence is copied).
+    """
+    top = max(population, key = lambda x: x.score)
+    if best is None or top.score > best.score:
+        best = chromActionSequence(list(top.seq))
+        best.score = top.score
+    return best
+
+def evolvePopulation(population, state, evaluator):
+    """
+    One generation: rank selection, crossover and mutation, then every
+    chromosome is rescored.  Returns the new population sorted from low to
+    high score, or None when the forward model budget ran out while scoring.
+    """
+    #sorts from low to high
+    population.sort(key = lambda x: x.score)
+    for j in range(0, len(population)):
+        population[j].rank = j + 1
+        population[j].selected = False
+    #need to cycle through whole population
+    printPopRanks(population)
+    while (countUnselectedPopMembers(population) > 1):
+        mom, dad = rankSelect(population)
+        #print('mom has rank {} and score {}, dad has rank {} and score {}'.format(mom.rank, mom.score, dad.rank, dad.score))
+        if random.random() <= 0.70 and ((mom or dad) is not None):
+            firstChild = crossover(mom, dad)
+            secondChild = crossover(mom, dad)
+            #print ('mom\'s sequence is {}'.format(mom.seq))
+            #print ('dad\'s sequence is {}'.format(dad.seq))
+            log.debug('firstChild seq is %s', firstChild.seq)
+            log.debug('secondChild seq is %s', secondChild.seq)
+            #find and remove mom, dad from chroms (population)
+            #return filter(lambda s: s[1] == value or s[2] == value, students)
+            #print('before filter population is sized {}'.format(len(population)))
+            #are there chances the same sequence exists elsewhere? 
+            population = filter(lambda x: ((x.seq is not mom.seq) and (x.seq is not dad.seq)), population)
+            #print('after filter population is {}'.format(population))
+            population.append(firstChild)
+            population.append(secondChild)
+            #print('after adding children population is sized {}'.format(len(population)))
+            #printPopRanks(population)
+            #print('after rankSelect call inside the crossover test. mom and dad are {} and {}, number of unselected chroms is {}'.format(mom, dad, countUnselectedPopMembers(population))) 
         else:
-            bChild = None
-            bcState = None
-    print('returning bChild, bcState')
-    return (bChild, bcState)
-
-def childScore(child, parent, parentState, constant):
-    global searchTree
-    childState = parentState.generatePacmanSuccessor(child.prevAction)
-    if childState is not None:
-        cIndex = searchTree.returnIndex(child)
-        pIndex = searchTree.returnIndex(parent)
-        childScore = (scoreEvaluation(childState) / searchTree.nodes[cIndex].visitCount) \
-        + (constant * (math.sqrt((2 * math.lgamma(searchTree.nodes[pIndex].visitCount) / searchTree.nodes[cIndex].visitCount))))
-        print('childState not none, score of {}'.format(childScore))
-        return (childScore, childState)
-    else:
-        print("childState is {}".format(childState))
-        return (float("-inf"), None)
-
-def defaultPolicy(lastState):
-    currentState = lastState
-    #print('inside default policy currentState is of type {}'.format(type(currentState)))
-    if isNotTerminal(currentState):
-       for i in range(0, 5):
-            print('inside default policy for loop, legal actions are {}'.format(currentState.getLegalPacmanActions()))
-            if len(currentState.getLegalPacmanActions()) > 0:
-                action = random.choice(currentState.getLegalPacmanActions())
-                nextState = lastState.generatePacmanSuccessor(action)
-                if nextState is not None: 
-                    if isNotTerminal(nextState):
-                        currentState = nextState
-                    else:
-                        break
+            #don't remove mom and dad, but find them in population and mark them selected
+            for chromosome in population:
+                if mom.seq == chromosome.seq and mom.rank == chromosome.rank and mom.score == chromosome.score:
+                    #print('marking mom visited.')
+                    chromosome.selected = True
+                elif dad.seq == chromosome.seq and dad.rank == chromosome.rank and dad.score == chromosome.score:
+                    chromosome.selected = True
+                    #print('marking dad visited.')
                 else:
-                    break
+                    continue
+            #print('ranks after marking parents as selected.')
+            #printPopRanks(population)
+    for k in range(0, len(population)):
+        if random.random() <= 0.10:
+            population[k] = mutateAction(population[k], state)
+    log.debug('before return of direction...recomputing rank for population.')
+    if not scorePopulation(state, population, evaluator):
+        return None
+    population.sort(key = lambda x: x.score)
+    for m in range(0, len(population)):
+        population[m].rank = m + 1
+    log.debug('ranks after recompute.')
+    printPopRanks(population)
+    return population
+
+class AStarAgent(Agent):
+    """
+    Plans the shortest way to eat every pellet with A* over
+    generatePacmanSuccessor, guided by foodSearchHeuristic (the larger of the
+    pellets left and the maze distance to the farthest one, both admissible).
+    With weight > 1 it runs weighted A*, trading path length for fewer
+    expansions, e.g. python pacman.py -p AStarAgent -l bigSearch -a weight=2 -i 20000
+
+    The plan is followed for as long as the game goes the way it predicted.
+    When the forward model budget or the move deadline runs out before the
+    goal is found, the plan leads to the generated state with the lowest
+    heuristic (the furthest one on ties).
+    Each expansion samples the ghosts' random moves once, so with ghosts on
+    the board the plan is usually made again every move.  The heuristic
+    values are kept between these searches, keyed on pacman's position and
+    the food left, until pacman eats.
+    """
+    def __init__(self, index = 0, weight = 1):
+        Agent.__init__(self, index)
+        self.weight = float(weight)
+
+    # Initialization Function: Called one time when the game starts
+    def registerInitialState(self, state):
+        self.plan = []
+        self.heuristicCache = {}
+        self.cacheFood = None
+        # (nodes expanded, seconds, complete plan) per search
+        self.searches = []
+        self.budgetUsed = []
+
+    # GetAction Function: Called with every frame
+    def getAction(self, state):
+        if len(self.plan) == 0 or self.plan[0][1] != searchKey(state):
+            deadline = state.getContext().moveDeadline
+            start = deadline.elapsed()
+            if state.data.foodPositions != self.cacheFood:
+                # most entries hold food that pacman has eaten since
+                self.heuristicCache = {}
+                self.cacheFood = state.data.foodPositions
+            self.plan, expanded, complete = aStarSearch(state, self.weight, self.heuristicCache)
+            self.searches.append((expanded, (deadline.elapsed() - start) / 1000.0, complete))
+            log.info('A* expanded %d nodes, plan of %d moves%s', expanded, len(self.plan),
+                     ['', ' (incomplete)'][not complete])
+        recordBudget(self, state.getContext())
+        if len(self.plan) == 0:
+            return Directions.STOP
+        return self.plan.pop(0)[0]
+
+def searchKey(state):
+    """
+    A compact hash of a GameState for the A* closed set: its Zobrist hash
+    (see GameStateData.computeZobrist) without pacman's direction, which
+    does not change where he can go.
+    """
+    data = state.data
+    hash(data)
+    configuration = data.agentStates[0].configuration
+    return data._zobrist ^ data._configurationKey(0, configuration) ^ \
+           zobristKey(('agent', 0, configuration.pos, Directions.STOP))
+
+def aStarSearch(rootState, weight, heuristicCache):
+    """
+    A* (weighted A* for weight > 1) from rootState to a won state, until the
+    forward model budget or the move deadline runs out.  Returns (plan,
+    nodes expanded, complete), where plan lists (action, searchKey of the
+    state it is played from) up to the goal or, when the goal was not
+    reached, up to the generated state with the lowest heuristic and then
+    the highest cost.  heuristicCache maps (pacman position, food positions)
+    to foodSearchHeuristic values.
+    """
+    def heuristic(state):
+        # foodSearchHeuristic only looks at pacman and the food
+        key = (state.getPacmanPosition(), state.data.foodPositions)
+        h = heuristicCache.get(key)
+        if h == None:
+            h = foodSearchHeuristic(state)
+            heuristicCache[key] = h
+        return h
+
+    rootKey = searchKey(rootState)
+    parents = {rootKey: None}
+    costs = {rootKey: 0}
+    closed = set()
+    h = heuristic(rootState)
+    frontier = [(weight * h, h, 0, rootState, rootKey)]
+    pushed = 1
+    best = (sys.maxint, 0, rootKey)
+    expanded = 0
+    context = rootState.getContext()
+    while len(frontier) > 0 and searchBudgetLeft(context):
+        f, h, tie, state, key = heapq.heappop(frontier)
+        if key in closed:
+            continue
+        if state.isWin():
+            return planTo(parents, key), expanded, True
+        closed.add(key)
+        expanded += 1
+        for action in state.getLegalPacmanActions():
+            child = state.generatePacmanSuccessor(action)
+            if child == None:
+                break
+            if child.isLose():
+                continue
+            childKey = searchKey(child)
+            cost = costs[key] + 1
+            if childKey in closed or cost >= costs.get(childKey, sys.maxint):
+                continue
+            costs[childKey] = cost
+            parents[childKey] = (key, action)
+            childH = heuristic(child)
+            if (childH, -cost) < best[:2]:
+                best = (childH, -cost, childKey)
+            heapq.heappush(frontier, (cost + weight * childH, childH, pushed, child, childKey))
+            pushed += 1
+    return planTo(parents, best[2]), expanded, False
+
+def planTo(parents, key):
+    "The (action, searchKey) steps from the search root to key."
+    plan = []
+    while parents[key] != None:
+        parentKey, action = parents[key]
+        plan.append((action, parentKey))
+        key = parentKey
+    plan.reverse()
+    return plan
+
+class ExpectimaxAgent(Agent):
+    """
+    Expectimax over the ghosts' real legal moves, weighted by the
+    distribution of the ghost agents pacman expects (ghost=random or
+    ghost=directional), with iterative deepening until the forward model
+    budget or the move deadline runs out.  A depth is a pacman move and one
+    move of every ghost; every pacman move expanded costs a forward model
+    call, e.g. python pacman.py -p ExpectimaxAgent -a ghost=directional --moveTime 200
+
+    Values are kept in a transposition table keyed on the state hash for the
+    whole game, so the subtrees searched on the previous move and the
+    previous iteration are not searched again.  Each iteration tries the best
+    move of the previous one first, and an iteration cut short by the budget
+    still counts when that move was searched.  table=0 and ordering=0 turn
+    these off, and depth caps the iterations.
+    """
+    def __init__(self, index = 0, ghost = 'random', depth = None, table = 1, ordering = 1):
+        Agent.__init__(self, index)
+        if ghost not in EXPECTIMAX_GHOSTS:
+            raise Exception('Unknown ghost model ' + str(ghost) + ', use random or directional')
+        self.ghostType = EXPECTIMAX_GHOSTS[ghost]
+        self.maxDepth = depth
+        if depth != None:
+            self.maxDepth = int(depth)
+        self.useTable = parseFlag(table)
+        self.ordering = parseFlag(ordering)
+
+    # Initialization Function: Called one time when the game starts
+    def registerInitialState(self, state):
+        self.ghosts = [self.ghostType(i) for i in range(1, state.getNumAgents())]
+        self.table = {}
+        # plies completed, pacman nodes expanded and seconds per move
+        self.searches = []
+        self.budgetUsed = []
+
+    # GetAction Function: Called with every frame
+    def getAction(self, state):
+        if not self.useTable or len(self.table) > EXPECTIMAX_TABLE_LIMIT:
+            self.table = {}
+        search = ExpectimaxSearch(self.table, self.ghosts, self.ordering)
+        context = state.getContext()
+        start = context.moveDeadline.elapsed()
+        action, depth = search.run(state, self.maxDepth)
+        self.searches.append((depth, search.expanded, (context.moveDeadline.elapsed() - start) / 1000.0))
+        log.info('expectimax searched %d plies and chose %s', depth, action)
+        recordBudget(self, context)
+        return action
+
+EXPECTIMAX_GHOSTS = {'random': ghostAgents.RandomGhost, 'directional': ghostAgents.DirectionalGhost}
+
+# Transposition table entries kept before the table is cleared
+EXPECTIMAX_TABLE_LIMIT = 500000
+
+class SearchTimeout(Exception):
+    "Unwinds a search when the forward model budget or the move deadline runs out."
+
+class ExpectimaxSearch:
+    """
+    One move's iterative deepening expectimax.  table maps a state hash to
+    (depth searched, value, best action) for pacman's nodes, with depth
+    sys.maxint when the search reached the end of every line below.
+    cutoff records whether the current iteration stopped any line early.
+    """
+    def __init__(self, table, ghosts, ordering = True):
+        self.table = table
+        self.ghosts = ghosts
+        self.ordering = ordering
+        self.expanded = 0
+        self.cutoff = False
+        self.context = None
+
+    def run(self, rootState, maxDepth = None):
+        """
+        Returns (action, plies searched).  Stops early once an iteration
+        reached the end of every line of play.
+        """
+        self.context = rootState.getContext()
+        order = rootState.getLegalPacmanActions()
+        if len(order) == 0:
+            return Directions.STOP, 0
+        order = self.ordered(rootState, order)
+        bestAction = order[0]
+        depth = 0
+        while maxDepth == None or depth < maxDepth:
+            self.cutoff = False
+            values = []
+            try:
+                for action in order:
+                    values.append((self.pacmanMove(rootState, action, depth + 1), action))
+            except SearchTimeout:
+                if self.ordering and len(values) > 0:
+                    bestAction = max(values, key = lambda pair: pair[0])[1]
+                break
+            depth += 1
+            bestValue, bestAction = max(values, key = lambda pair: pair[0])
+            self.table[hash(rootState)] = (depth, bestValue, bestAction)
+            if self.ordering:
+                values.sort(key = lambda pair: -pair[0])
+                order = [action for value, action in values]
+            if not self.cutoff:
+                break
+        return bestAction, depth
+
+    def ordered(self, state, actions):
+        "Puts the best action of the table entry for state first."
+        entry = self.table.get(hash(state))
+        if self.ordering and entry != None and entry[2] in actions:
+            actions.remove(entry[2])
+            actions.insert(0, entry[2])
+        return actions
+
+    def pacmanMove(self, state, action, depth):
+        self.context.currentIterations -= 1
+        if not searchBudgetLeft(self.context):
+            raise SearchTimeout()
+        self.expanded += 1
+        return self.ghostValue(state.generateSuccessor(0, action), 1, depth)
+
+    def maxValue(self, state, depth):
+        if state.isWin() or state.isLose():
+            return foodDistanceEvaluation(state)
+        if depth == 0:
+            self.cutoff = True
+            return foodDistanceEvaluation(state)
+        key = hash(state)
+        entry = self.table.get(key)
+        if entry != None and entry[0] >= depth:
+            if entry[0] != sys.maxint:
+                self.cutoff = True
+            return entry[1]
+        cutoff, self.cutoff = self.cutoff, False
+        bestValue, bestAction = None, None
+        for action in self.ordered(state, state.getLegalPacmanActions()):
+            value = self.pacmanMove(state, action, depth)
+            if bestValue == None or value > bestValue:
+                bestValue, bestAction = value, action
+        if bestValue == None:
+            bestValue = foodDistanceEvaluation(state)
+        # A subtree searched to the end of every line holds at any depth
+        if self.cutoff:
+            self.table[key] = (depth, bestValue, bestAction)
+        else:
+            self.table[key] = (sys.maxint, bestValue, bestAction)
+        self.cutoff = self.cutoff or cutoff
+        return bestValue
+
+    def ghostValue(self, state, ghostIndex, depth):
+        "The expected value of the ghosts from ghostIndex on moving, then pacman."
+        if state.isWin() or state.isLose():
+            return foodDistanceEvaluation(state)
+        if ghostIndex == state.getNumAgents():
+            return self.maxValue(state, depth - 1)
+        distribution = self.ghosts[ghostIndex - 1].getDistribution(state)
+        if len(distribution) == 0:
+            return self.ghostValue(state.generateSuccessor(ghostIndex, Directions.STOP), ghostIndex + 1, depth)
+        value = 0.0
+        for action, probability in distribution.items():
+            if probability > 0:
+                successor = state.generateSuccessor(ghostIndex, action)
+                value += probability * self.ghostValue(successor, ghostIndex + 1, depth)
+        return value
+
+class MCTSAgent(Agent):
+    """
+    UCT search over the forward model.  With reuse on (the default), the tree
+    is kept between moves: the next search starts from the subtree reached by
+    the action played and the ghost moves that followed, e.g.
+    python pacman.py -p MCTSAgent -a reuse=0 to search from scratch every move.
+
+    With workers > 1 the search runs over a pool of worker processes, each
+    allowed workerBudget forward model calls per move (default: the -i
+    budget).  mode=root grows an independent tree in every worker and adds up
+    the root visit counts; mode=leaf keeps one tree here and sends the random
+    rollouts from a batch of leaves to the workers, e.g.
+    python pacman.py -p MCTSAgent -a workers=8,workerBudget=500,mode=root
+    The pool is closed by final, or when the agent is garbage collected (for
+    drivers that never call final).
+    """
+    def __init__(self, index = 0, reuse = 1, workers = 1, workerBudget = None, mode = 'root'):
+        Agent.__init__(self, index)
+        self.reuse = parseFlag(reuse)
+        self.workers = int(workers)
+        self.workerBudget = workerBudget
+        if workerBudget != None:
+            self.workerBudget = int(workerBudget)
+        if mode not in ('root', 'leaf'):
+            raise Exception('Unknown MCTS mode ' + str(mode) + ', use root or leaf')
+        self.mode = mode
+        self.pool = None
+        self.poolLayout = None
+
+    # Initialization Function: Called one time when the game starts
+    def registerInitialState(self, state):
+        self.searchTree = None
+        self.lastAction = None
+        # (nodes kept from the previous move, nodes after the search) per move
+        self.decisions = []
+        self.budgetUsed = []
+
+    # GetAction Function: Called with every frame
+    def getAction(self, state):
+        context = state.getContext()
+        workerBudget = self.workerBudget
+        if workerBudget == None:
+            workerBudget = context.maxIterations
+        workerCalls = 0
+        if self.workers > 1 and self.mode == 'root':
+            bestChildAction, workerCalls = rootParallelSearch(state, self.getPool(state), self.workers,
+                                                              workerBudget)
+        else:
+            if self.reuse and self.searchTree is not None:
+                self.searchTree.reroot(self.lastAction, ghostOutcome(state))
+            else:
+                self.searchTree = UTCSearchTree()
+            reused = self.searchTree.size
+            if self.workers > 1:
+                bestChildAction, workerCalls = leafParallelSearch(state, self.searchTree, self.getPool(state),
+                                                                  self.workers, workerBudget)
             else:
+                bestChildAction = UTCSearch(state, self.searchTree)
+            self.decisions.append((reused, self.searchTree.size))
+        self.lastAction = bestChildAction
+        log.info('UTCSearch returned %s', bestChildAction)
+        recordBudget(self, context, workerCalls)
+        return returnDirections(bestChildAction)
+
+    def getPool(self, state):
+        """
+        The worker pool for state's layout, which every worker receives once
+        when it starts.  A game on another layout gets a new pool.
+        """
+        layout = state.data.layout
+        if self.pool is not None and self.poolLayout is not layout:
+            self.closePool()
+        if self.pool is None:
+            self.pool = searchPool(self.workers, layout)
+            self.poolLayout = layout
+        return self.pool
+
+    def closePool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.poolLayout = None
+
+    def final(self, state):
+        self.closePool()
+
+    def __del__(self):
+        # getattr: __init__ may have failed before setting pool
+        if getattr(self, 'pool', None) is not None:
+            self.pool.terminate()
+
+# The layout of the searches a worker process runs (see searchPool)
+_workerLayout = None
+
+def searchPool(workers, layout):
+    """
+    A pool of processes for rootParallelSearch and leafParallelSearch on
+    layout.  Each worker gets the layout once, when it starts; the states of
+    the tasks are pickled with a reference to it (see agentProcess.dumps).
+    """
+    return multiprocessing.Pool(workers, initSearchWorker, (layout,))
+
+def initSearchWorker(layout):
+    global _workerLayout
+    _workerLayout = layout
+
+def UTCSearch(rootState, searchTree, iterations = None):
+    """
+    Runs UCT iterations (select, expand, random rollout, backup) from
+    rootState on searchTree until the forward model budget is used up, or
+    after the given number of iterations, and returns the most visited root
+    action.  Every iteration replays its line of pacman moves with fresh
+    random ghost moves and follows the child for the outcome it got.
+    """
+    state = SearchState(rootState)
+    deadline = rootState.getContext().moveDeadline
+    count = 0
+    while (iterations is None or count < iterations) and not deadline.expired():
+        node = treePolicy(searchTree, searchTree.root, state)
+        if node is None:
+            break
+        if not defaultPolicy(state):
+            break
+        backup(node, rolloutReward(state))
+        while state.getDepth() > 0:
+            state.undo()
+        count += 1
+    root = searchTree.root
+    if len(root.actionVisits) == 0:
+        return random.choice(rootState.getLegalPacmanActions())
+    return mostVisitedAction(root.actionVisits)
+
+def rolloutReward(state):
+    """
+    The reward backed up for a rollout ending in state: scoreEvaluation on
+    the scale of normalizedScoreEvaluation, but without subtracting the
+    root's value.  UCT only compares actions of the same node, so the
+    baseline makes no difference to a search, and without one the rewards
+    kept by UTCSearchTree.reroot match those of the new root's rollouts.
+    """
+    return scoreEvaluation(state) / 1000.0
+
+def mostVisitedAction(actionVisits):
+    return max(actionVisits.keys(), key = lambda action: actionVisits[action])
+
+def rootParallelSearch(rootState, pool, workers, workerBudget):
+    """
+    Grows an independent UCT tree from rootState in each of the pool's
+    workers (see searchPool).  Returns the action with the most root visits
+    over all trees and the forward model calls the workers made.
+    """
+    snapshot = agentProcess.dumps(rootState, rootState.data.layout)
+    tasks = [(snapshot, workerBudget, rootState.getContext().moveDeadline.remaining(), random.randint(0, sys.maxint))
+             for i in range(workers)]
+    actionVisits = {}
+    workerCalls = 0
+    for visits, calls in pool.map(rootSearchTask, tasks):
+        for action, count in visits.iteritems():
+            actionVisits[action] = actionVisits.get(action, 0) + count
+        workerCalls += calls
+    if len(actionVisits) == 0:
+        return random.choice(rootState.getLegalPacmanActions()), workerCalls
+    return mostVisitedAction(actionVisits), workerCalls
+
+def rootSearchTask(task):
+    """
+    Searches from a pickled root state.  Returns the root's visits per action
+    and the forward model calls made.
+    """
+    snapshot, budget, milliseconds, seed = task
+    rootState = agentProcess.loads(snapshot, _workerLayout)
+    random.seed(seed)
+    # rootState arrived pickled, so this worker has a context of its own
+    context = rootState.getContext()
+    context.currentIterations = budget + 1
+    context.moveDeadline = Deadline(milliseconds)
+    searchTree = UTCSearchTree()
+    UTCSearch(rootState, searchTree)
+    return searchTree.root.actionVisits, min(budget, budget + 1 - context.currentIterations)
+
+# forward model calls a worker spends on rollouts from one leaf
+LEAF_BUDGET = 50
+
+def leafParallelSearch(rootState, searchTree, pool, workers, workerBudget):
+    """
+    UCT on searchTree where the rollouts are done by the pool: each batch
+    selects one leaf per worker, and every worker plays LEAF_BUDGET forward
+    model calls of random rollouts from its leaf.  Stops when the workers
+    have used workerBudget calls each, or this process's own forward model
+    budget for walking the tree runs out.  Returns the most visited root
+    action and the forward model calls the workers made.
+    """
+    state = SearchState(rootState)
+    remaining = workers * workerBudget
+    workerCalls = 0
+    deadline = rootState.getContext().moveDeadline
+    while remaining > 0 and not deadline.expired():
+        leaves = []
+        for i in range(workers):
+            node = treePolicy(searchTree, searchTree.root, state)
+            if node is None:
                 break
-    #print('in default policy currentState is type {}\n and has actions {}'.format(type(currentState), currentState.getLegalPacmanActions()))
-    return currentState    
-
-def backup(lastNode, lastState, rootState, terminalStateReward):
-    global searchTree
-    node = lastNode
-    nextState = lastState
-    while (node.parent and nextState) is not None:
-        node.visitCount += 1
-        node.score = node.score + terminalStateReward
-        searchTree.updateOrAddNode(node)
-        if nextState.isWin() or nextState.isLose():
-            nextState = None
+            leaves.append((node, agentProcess.dumps(state, state.layout)))
+            while state.getDepth() > 0:
+                state.undo()
+        tasks = [(snapshot, LEAF_BUDGET, random.randint(0, sys.maxint)) for node, snapshot in leaves]
+        for (node, snapshot), (reward, visits, calls) in zip(leaves, pool.map(leafRolloutTask, tasks)):
+            if visits > 0:
+                backup(node, reward, visits)
+            remaining -= calls
+            workerCalls += calls
+        if len(leaves) < workers:
+            break
+    root = searchTree.root
+    if len(root.actionVisits) == 0:
+        return random.choice(rootState.getLegalPacmanActions()), workerCalls
+    return mostVisitedAction(root.actionVisits), workerCalls
+
+def leafRolloutTask(task):
+    """
+    Plays random rollouts from a pickled SearchState until the budget is
+    spent.  Returns (total rolloutReward, rollouts, forward model calls).
+    """
+    snapshot, budget, seed = task
+    state = agentProcess.loads(snapshot, _workerLayout)
+    random.seed(seed)
+    context = state.getContext()
+    context.currentIterations = budget + 1
+    base = state.getDepth()
+    total = 0.0
+    visits = 0
+    while defaultPolicy(state):
+        total += rolloutReward(state)
+        visits += 1
+        if state.getDepth() == base:
+            break
+        while state.getDepth() > base:
+            state.undo()
+    return (total, visits, min(budget, budget + 1 - context.currentIterations))
+
+def treePolicy(searchTree, node, state):
+    """
+    Walks down from node, applying the actions on the way to state, until it
+    reaches an untried action, an unseen ghost outcome or a terminal state.
+    Returns the last node, or None when the forward model budget ran out.
+    """
+    while isNotTerminal(state):
+        if node.untried is None:
+            node.untried = state.getLegalPacmanActions()
+        expanding = len(node.untried) > 0
+        if expanding:
+            action = random.choice(node.untried)
         else:
-            nextState = nextState.generatePacmanSuccessor(node.prevAction)
-            node = node.parent  
+            #constant of 1 as given by assignment document
+            action = bestAction(node, 1)
+        if not state.apply(action):
+            return None
+        outcome = ghostOutcome(state)
+        child = node.children.get((action, outcome))
+        if child is None:
+            return searchTree.addChild(node, action, outcome)
+        if expanding:
+            return child
+        node = child
+    return node
+
+def bestAction(node, constant):
+    logVisits = math.log(node.visitCount)
+    best = None
+    bestScore = float("-inf")
+    for action, visits in node.actionVisits.iteritems():
+        score = actionScore(node.actionRewards[action], visits, logVisits, constant)
+        if score > bestScore:
+            best = action
+            bestScore = score
+    return best
+
+def actionScore(totalReward, visits, logParentVisits, constant):
+    return totalReward / visits + constant * math.sqrt(2 * logParentVisits / visits)
+
+def defaultPolicy(state, depth = 5):
+    """
+    Plays up to depth random pacman moves on state.  Returns False when the
+    forward model budget ran out.
+    """
+    for i in range(0, depth):
+        if not isNotTerminal(state):
+            break
+        if not state.apply(random.choice(state.getLegalPacmanActions())):
+            return False
+    return True
+
+def backup(node, reward, visits = 1):
+    """
+    Adds visits rollouts with the given total reward to node and every node
+    above it.
+    """
+    while node.parent is not None:
+        node.visitCount += visits
+        parent, action = node.parent, node.prevAction
+        if action in parent.actionVisits:
+            parent.actionVisits[action] += visits
+            parent.actionRewards[action] += reward
+        else:
+            parent.untried.remove(action)
+            parent.actionVisits[action] = visits
+            parent.actionRewards[action] = reward
+        node = parent
+    node.visitCount += visits
+
+def searchBudgetLeft(context):
+    """
+    True while both the forward model budget and the move deadline of the
+    game's context allow more search.
+    """
+    return context.currentIterations > 1 and not context.moveDeadline.expired()
+
+def recordBudget(agent, context, workerCalls = 0):
+    """
+    Appends the (milliseconds, forward model calls) this decision used to
+    agent.budgetUsed and logs them against the move's budgets.  workerCalls
+    are the calls made for it in worker processes, which this process's
+    context does not see.
+    """
+    deadline = context.moveDeadline
+    calls = min(context.maxIterations, context.maxIterations - context.currentIterations) + workerCalls
+    agent.budgetUsed.append((deadline.elapsed(), calls))
+    if not log.isEnabledFor(logging.INFO):
+        return
+    if deadline.milliseconds == None:
+        limit = ''
+    else:
+        limit = ' of %.0f' % deadline.milliseconds
+    log.info('decision used %.1f%s ms and %d of %d forward model calls', deadline.elapsed(), limit,
+             calls, context.maxIterations)
 
 def isNotTerminal(state):
     if state.isWin():
@@ -392,6 +1026,20 @@ def isNotTerminal(state):
     else:
         return True
 
+def parseFlag(value):
+    "Reads an on/off agent argument such as reuse=0 or rolling=True."
+    return str(value).lower() not in ('0', 'false')
+
+def shiftSequence(state, sequence, length):
+    """
+    Drops the first action of sequence (the one just played) and pads it
+    with random actions back to length.
+    """
+    sequence = sequence[1:]
+    while len(sequence) < length:
+        sequence.append(random.choice(state.getAllPossibleActions()))
+    return sequence
+
 def buildRandomSequence(state):
     sequence = [None] * 5
     for index in range(0, 5):
@@ -410,48 +1058,75 @@ def hillClimbBuildNeighborSequence(state, randSeq):
     return (hillClimbSeq)
 
 def scoreAndTruncateActionSeq(state, sequence):
-    nextState = None
-    for index in range(0, len(sequence) - 1):
-        nextState = state.generatePacmanSuccessor(sequence[index])
+    """
+    Plays the sequence from state, one successor after another, and returns
+    (score, sequence).  A sequence that loses is scored on the losing state
+    and cut off before the losing action.  Returns (None, sequence) when the
+    forward model budget runs out before the sequence is scored.
+    """
+    nextState = state
+    for index in range(0, len(sequence)):
+        nextState = nextState.generatePacmanSuccessor(sequence[index])
+        if nextState is None:
+            return (None, sequence)
         if nextState.isLose():
-            sequence = [sequence[i] for i in range(0, index)]
             score = scoreEvaluation(nextState)
-            print('Lost in scoring computation, sequence returned is {}, length is {}'.format(sequence, len(sequence)))
-            if len(sequence) == 0:
-                while nextState.isLose():
-                    randSeq = buildRandomSequence(state)
-                    randIndex = random.randint(0, (len(randSeq) - 1))
-                    nextState = state.generatePacmanSuccessor(randSeq[randIndex])
-                sequence.append(randSeq[randIndex])
+            sequence = truncateSequence(state, sequence, index)
+            log.debug('Lost in scoring computation, sequence returned is %s, length is %d', sequence, len(sequence))
             return (score, sequence)
         elif nextState.isWin():
-            score = scoreEvaluation(nextState)
-            return (score, sequence)
-        else:
-           continue
-    if nextState is not None:
-        score = scoreEvaluation(nextState)
-    else:
-        print('nextState not created, sequence returned is {}'.format(sequence))
-        score = scoreEvaluation(state)
-    return (score, sequence)
+            break
+    return (scoreEvaluation(nextState), sequence)
+
+def scorePopulation(state, population, evaluator):
+    """
+    Scores and truncates every chromosome like scoreAndTruncateActionSeq, with
+    one SequenceEvaluator pass that simulates each shared prefix once.
+    Returns False when the forward model budget ran out first.
+    """
+    results = evaluator.evaluate(state, [chrom.seq for chrom in population])
+    for chrom, (score, truncation) in zip(population, results):
+        if score is None:
+            return False
+        chrom.score = score
+        chrom.seq = truncateSequence(state, chrom.seq, truncation)
+    return True
+
+def truncateSequence(state, sequence, length):
+    """
+    Cuts sequence down to its first length actions.  When nothing is left, a
+    first action pacman survives (if there is one) is kept instead.
+    """
+    if length == len(sequence):
+        return sequence
+    sequence = sequence[:length]
+    if len(sequence) == 0:
+        actions = state.getAllPossibleActions()
+        random.shuffle(actions)
+        for action in actions:
+            nextState = state.generatePacmanSuccessor(action)
+            if nextState is None or not nextState.isLose():
+                break
+        sequence.append(action)
+    return sequence
 
 def rankSelect(population):
-    print('inside rankSelect, number of unselected members is {}'.format(countUnselectedPopMembers(population)))
+    unselected = countUnselectedPopMembers(population)
+    log.debug('inside rankSelect, number of unselected members is %d', unselected)
     selectionPop = []
-    if countUnselectedPopMembers(population) == 0:
+    if unselected == 0:
         return (None, None)
     #there should not be a countUnselectedPopMembers(population) == 1 case as every set of parents is 2 and initial population is 8
-    elif countUnselectedPopMembers(population) == 2:
-        print('only two left ')
+    elif unselected == 2:
+        log.debug('only two left ')
         indices = [0, 1]
         randomIndex = random.choice(indices)
         mom = chromActionSequence(population[randomIndex].seq)
         dad = chromActionSequence(population[abs(randomIndex - 1)].seq)
-        print('rand index is {} and abs of that minus one is {}'.format(randomIndex, abs(randomIndex - 1)))
+        log.debug('rand index is %d and abs of that minus one is %d', randomIndex, abs(randomIndex - 1))
         mom.selected = True
         dad.selected = True
-        print('inside only two left...mom is {} and dad is {}'.format(mom, dad))
+        log.debug('inside only two left...mom is %s and dad is %s', mom, dad)
         return (mom, dad)
     else:
         for i in range(0, len(population)):
@@ -462,7 +1137,7 @@ def rankSelect(population):
                         selectionPop.append(population[i])
             else:
                 continue
-        print('selectionPop is sized {}'.format(len(selectionPop)))
+        log.debug('selectionPop is sized %d', len(selectionPop))
         #print('and is composed of {}'.format(selectionPop))
         if len(selectionPop) > 0:
             mom = random.choice(selectionPop)
@@ -488,19 +1163,19 @@ def crossover(mom, dad):
                 child.seq[i] = dad.seq[i]
         for k in range(lengthDiff, len(dad.seq)):
             child.seq.append(dad.seq[k])
-        print('crossover if statement, child.seq is {}'.format(child.seq))
+        log.debug('crossover if statement, child.seq is %s', child.seq)
     else:    
         for j in range(0, len(dad.seq)):
             inheritanceTestValue = random.random()
             if inheritanceTestValue > 0.50:
                 child.seq[j] = dad.seq[j]
-        print('crossover else statement, child seq is {}'.format(child.seq))
+        log.debug('crossover else statement, child seq is %s', child.seq)
     return(child)
 
 def mutateAction(chrom, state):
     randIndex = random.randint(0, min((len(chrom.seq) - 1), 4))
     randActionList = buildRandomSequence(state)
-    print('length of the given chrom is {} length of random seq is {} and randIndex is {}'.format(len(chrom.seq), len(randActionList), randIndex))
+    log.debug('length of the given chrom is %d length of random seq is %d and randIndex is %d', len(chrom.seq), len(randActionList), randIndex)
     chrom.seq[randIndex] = randActionList[randIndex]
     return (chrom)
 
@@ -514,14 +1189,12 @@ def returnDirections(move):
     elif move == ('South' or 'SOUTH'):
         return Directions.SOUTH
     else:
-        print('returning STOP. move passed was {}'.format(move))
+        log.debug('returning STOP. move passed was %s', move)
         return Directions.STOP
 
 def countUnselectedPopMembers(population):
     count = 0
-    print('chromosomes in population are of type:')
     for chromosome in population:
-        print('{}'.format(type(chromosome)))
         if chromosome.selected == False:
             count += 1
         else:
@@ -529,6 +1202,8 @@ def countUnselectedPopMembers(population):
     return (count)
 
 def printPopRanks(population):
+    if not log.isEnabledFor(logging.DEBUG):
+        return
     for index in range(0, len(population)):
-        print('Index {} in population is rank {} and score {}'.format(index, population[index].rank, population[index].score))
-        print('population sequence is {}'.format(population[index].seq))
\ No newline at end of file
+        log.debug('Index %d in population is rank %s and score %s', index, population[index].rank, population[index].score)
+        log.debug('population sequence is %s', population[index].seq)
\ No newline at end of file
@@ -0,0 +1,278 @@
+# searchState.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A mutable copy of a GameState for search agents that walk one line of play
+and then back up.  Instead of allocating a new GameState per step,
+
+  searchState = SearchState(gameState)
+  if searchState.apply(action):     # same as gameState.generatePacmanSuccessor(action)
+      ...
+      searchState.undo()            # back to where we were
+
+apply() follows the classic rules exactly (including the random ghost moves
+and the forward model budget of the game's GameContext), so with the same
+random seed a line of apply() calls visits the same states as a chain of
+generatePacmanSuccessor calls.  Undo records are kept in a pool and reused,
+so after the first rollout to a given depth no undo bookkeeping is allocated.
+"""
+
+from game import Grid
+from game import Directions
+from game import Actions
+from util import nearestPoint
+from util import manhattanDistance
+import pacman
+import random
+
+class SearchState:
+    """
+    A GameState that is changed in place by apply(action) and restored by
+    undo().  Only pacman moves are applied; the ghosts answer with random
+    legal moves, as in GameState.generatePacmanSuccessor.
+    """
+    def __init__( self, gameState ):
+        data = gameState.data
+        self.layout = data.layout
+        self.food = data.food.copy()
+        self.foodPositions = set( data.foodPositions )
+        self.capsules = list( data.capsules )
+        agentStates = data.agentStates
+        self.positions = [a.configuration.pos for a in agentStates]
+        self.directions = [a.configuration.direction for a in agentStates]
+        self.timers = [a.scaredTimer for a in agentStates]
+        self.starts = [a.start for a in agentStates]
+        self.score = data.score
+        self.win = data._win
+        self.lose = data._lose
+        self._scoreChange = 0
+        self._eatenFood = None
+        self._eatenCapsule = None
+        self._records = []
+        self._depth = 0
+        self.context = gameState.getContext()
+
+    ####################################################
+    # Accessor methods: use these to access state data #
+    ####################################################
+    def getLegalActions( self, agentIndex=0 ):
+        if self.win or self.lose: return []
+        if agentIndex == 0:
+            return list( self.layout.getLegalActions( self.positions[0], self.directions[0] ) )
+        return list( self.layout.getLegalGhostActions( self.positions[agentIndex], self.directions[agentIndex] ) )
+
+    def getLegalPacmanActions( self ):
+        actions = self.getLegalActions( 0 )
+        if Directions.STOP in actions: actions.remove( Directions.STOP )
+        return actions
+
+    def getAllPossibleActions( self ):
+        return [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+    def getPacmanPosition( self ):
+        return self.positions[0]
+
+    def getGhostPosition( self, agentIndex ):
+        if agentIndex == 0:
+            raise Exception("Pacman's index passed to getGhostPosition")
+        return self.positions[agentIndex]
+
+    def getGhostPositions( self ):
+        return self.positions[1:]
+
+    def getScaredTimer( self, agentIndex ):
+        return self.timers[agentIndex]
+
+    def getNumAgents( self ):
+        return len( self.positions )
+
+    def getScore( self ):
+        return float( self.score )
+
+    def getContext( self ):
+        return self.context
+
+    def getCapsules( self ):
+        return self.capsules
+
+    def getNumFood( self ):
+        return len( self.foodPositions )
+
+    def getFoodPositions( self ):
+        return self.foodPositions
+
+    def getFood( self ):
+        return self.food
+
+    def getWalls( self ):
+        return self.layout.walls
+
+    def getMazeDistance( self, pos1, pos2 ):
+        return self.layout.getMazeDistance( pos1, pos2 )
+
+    def hasFood( self, x, y ):
+        return self.food[x][y]
+
+    def hasWall( self, x, y ):
+        return self.layout.walls[x][y]
+
+    def isLose( self ):
+        return self.lose
+
+    def isWin( self ):
+        return self.win
+
+    def getDepth( self ):
+        """
+        Returns the number of applied actions that can still be undone.
+        """
+        return self._depth
+
+    ##################
+    # Make / unmake  #
+    ##################
+    def apply( self, action ):
+        """
+        Applies a pacman move followed by a random legal move for every ghost.
+        Returns False, leaving the state unchanged, when the forward model
+        budget is used up (where generatePacmanSuccessor would return None).
+        """
+        if self.win or self.lose: raise Exception('Can\'t generate a successor of a terminal state.')
+        context = self.context
+        context.currentIterations -= 1
+        if context.currentIterations <= 0:
+            return False
+        self._pushRecord()
+
+        self._movePacman( action )
+        for index in range( 1, len( self.positions ) ):
+            if self.win or self.lose:
+                break
+            actions = self.layout.getLegalGhostActions( self.positions[index], self.directions[index] )
+            if len( actions ) > 0:
+                self._moveGhost( index, actions[random.randint( 0, len( actions ) - 1 )] )
+            else:
+                self._moveGhost( index, Directions.STOP )
+        return True
+
+    def undo( self ):
+        """
+        Restores the state from before the last successful apply().
+        """
+        if self._depth == 0: raise Exception('Nothing to undo.')
+        self._depth -= 1
+        positions, directions, timers, score, win, lose, eatenFood, eatenCapsule = self._records[self._depth]
+        self.positions[:] = positions
+        self.directions[:] = directions
+        self.timers[:] = timers
+        self.score, self.win, self.lose = score, win, lose
+        if eatenFood != None:
+            x, y = eatenFood
+            self.food[x][y] = True
+            self.foodPositions.add( eatenFood )
+        if eatenCapsule != None:
+            index, position = eatenCapsule
+            self.capsules.insert( index, position )
+
+    def _pushRecord( self ):
+        if self._depth == len( self._records ):
+            self._records.append( [self.positions[:], self.directions[:], self.timers[:], 0, False, False, None, None] )
+        record = self._records[self._depth]
+        record[0][:] = self.positions
+        record[1][:] = self.directions
+        record[2][:] = self.timers
+        record[3], record[4], record[5] = self.score, self.win, self.lose
+        record[6] = record[7] = None
+        self._depth += 1
+
+    def _move( self, index, action, speed ):
+        pos = self.positions[index]
+        next = None
+        if speed == 1:
+            next = self.layout.getSuccessor( pos, action )
+        if next == None:
+            dx, dy = Actions.directionToVector( action, speed )
+            next = (pos[0] + dx, pos[1] + dy)
+        self.positions[index] = next
+        if action != Directions.STOP:
+            self.directions[index] = action
+
+    def _movePacman( self, action ):
+        self._scoreChange = 0
+        if action not in self.layout.getLegalActions( self.positions[0], self.directions[0] ):
+            action = Directions.STOP
+        if action != Directions.STOP:
+            self._move( 0, action, pacman.PacmanRules.PACMAN_SPEED )
+
+        # Eat
+        next = self.positions[0]
+        nearest = nearestPoint( next )
+        if manhattanDistance( nearest, next ) <= 0.5:
+            self._consume( nearest )
+
+        self._scoreChange += -pacman.TIME_PENALTY
+        for index in range( 1, len( self.positions ) ):
+            self._checkDeath( index )
+        self.score += self._scoreChange
+
+    def _consume( self, position ):
+        x, y = position
+        record = self._records[self._depth - 1]
+        # Eat food
+        if self.food[x][y]:
+            self._scoreChange += 10
+            self.food[x][y] = False
+            self.foodPositions.remove( position )
+            record[6] = position
+            if len( self.foodPositions ) == 0 and not self.lose:
+                self._scoreChange += 500
+                self.win = True
+        # Eat capsule
+        if position in self.capsules:
+            index = self.capsules.index( position )
+            del self.capsules[index]
+            record[7] = (index, position)
+            # Reset all ghosts' scared timers
+            for index in range( 1, len( self.timers ) ):
+                self.timers[index] = pacman.SCARED_TIME
+
+    def _moveGhost( self, index, action ):
+        self._scoreChange = 0
+        if action not in self.layout.getLegalGhostActions( self.positions[index], self.directions[index] ):
+            raise Exception("Illegal ghost action " + str(action))
+        speed = pacman.GhostRules.GHOST_SPEED
+        if self.timers[index] > 0: speed /= 2.0
+        self._move( index, action, speed )
+
+        # Time passes
+        timer = self.timers[index]
+        if timer == 1:
+            self.positions[index] = nearestPoint( self.positions[index] )
+        if timer > 0:
+            self.timers[index] = timer - 1
+
+        self._checkDeath( index )
+        self.score += self._scoreChange
+
+    def _checkDeath( self, index ):
+        if manhattanDistance( self.positions[index], self.positions[0] ) <= pacman.COLLISION_TOLERANCE:
+            if self.timers[index] > 0:
+                self._scoreChange += 200
+                start = self.starts[index]
+                self.positions[index] = start.pos
+                self.directions[index] = start.direction
+                self.timers[index] = 0
+            elif not self.win:
+                self._scoreChange -= 500
+                self.lose = True
@@ -0,0 +1,120 @@
+# sequenceTrie.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Scores a whole population of pacman action sequences at once.  The
+sequences are merged into a trie on their common prefixes and the trie is
+walked depth first with SearchState apply/undo, so every distinct prefix is
+simulated once and the states only branch where sequences diverge:
+
+  evaluator = SequenceEvaluator()
+  results = evaluator.evaluate(gameState, sequences)
+  for score, truncation in results:
+      ...
+  print evaluator.report()          # or str(evaluator)
+
+Sequences that share a prefix also share the random ghost moves along it.
+"""
+
+from heuristics import scoreEvaluation
+from searchState import SearchState
+
+class TrieNode(object):
+    """
+    A prefix shared by the sequences in members.  ending holds the sequences
+    that stop here.
+    """
+    __slots__ = ('children', 'members', 'ending')
+
+    def __init__( self ):
+        self.children = {}
+        self.members = []
+        self.ending = []
+
+def buildTrie( sequences ):
+    root = TrieNode()
+    for index, sequence in enumerate( sequences ):
+        node = root
+        node.members.append( index )
+        for action in sequence:
+            child = node.children.get( action )
+            if child == None:
+                child = TrieNode()
+                node.children[action] = child
+            node = child
+            node.members.append( index )
+        node.ending.append( index )
+    return root
+
+class SequenceEvaluator:
+    """
+    Scores populations of action sequences from a state, like running
+    scoreAndTruncateActionSeq on each of them.  calls counts the forward model
+    calls made and naiveCalls the ones scoring each sequence on its own would
+    have made, over every evaluate() since the last reset().
+    """
+    def __init__( self ):
+        self.reset()
+
+    def reset( self ):
+        self.calls = 0
+        self.naiveCalls = 0
+
+    def evaluate( self, state, sequences ):
+        """
+        Returns one (score, truncation) pair per sequence.  A sequence that
+        loses is scored on the losing state and truncated to the actions
+        before the losing one; otherwise the truncation is its length and the
+        score is taken where it wins or ends.  The score is None for every
+        sequence the forward model budget did not stretch to.
+        """
+        results = [None] * len( sequences )
+        searchState = SearchState( state )
+        root = buildTrie( sequences )
+        for index in root.ending:
+            results[index] = (scoreEvaluation( searchState ), 0)
+        self._walk( searchState, root, 0, sequences, results )
+        return results
+
+    def _walk( self, state, node, depth, sequences, results ):
+        for action, child in node.children.iteritems():
+            if not state.apply( action ):
+                for index in child.members:
+                    results[index] = (None, len( sequences[index] ))
+                continue
+            self.calls += 1
+            self.naiveCalls += len( child.members )
+            if state.isLose():
+                score = scoreEvaluation( state )
+                for index in child.members:
+                    results[index] = (score, depth)
+            elif state.isWin():
+                score = scoreEvaluation( state )
+                for index in child.members:
+                    results[index] = (score, len( sequences[index] ))
+            else:
+                score = scoreEvaluation( state )
+                for index in child.ending:
+                    results[index] = (score, depth + 1)
+                self._walk( state, child, depth + 1, sequences, results )
+            state.undo()
+
+    def report( self ):
+        saved = 0.0
+        if self.naiveCalls > 0:
+            saved = 100.0 * ( self.naiveCalls - self.calls ) / self.naiveCalls
+        return 'sequence trie made %d of %d forward model calls (%.0f%% saved)' % ( self.calls, self.naiveCalls, saved )
+
+    def __str__( self ):
+        return self.report()
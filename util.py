@@ -30,6 +30,7 @@ import sys
 import inspect
 import heapq, random
 import cStringIO
+import logging
 
 
 class FixedRandom:
@@ -512,6 +513,7 @@ def pause():
 # this have all student code so wrapped.
 #
 import signal
+import threading
 import time
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
@@ -519,6 +521,13 @@ class TimeoutFunctionException(Exception):
 
 
 class TimeoutFunction:
+    """
+    Calls function with a time limit in seconds, fractions included.  In the
+    main thread a SIGALRM timer interrupts the call; signals can't be used
+    from other threads, so there the time taken is checked once the call
+    has returned.  To stop a runaway call from any thread, host the code in
+    a child process (agentProcess.py).
+    """
     def __init__(self, function, timeout):
         self.timeout = timeout
         self.function = function
@@ -530,14 +539,16 @@ class TimeoutFunction:
         # If we have SIGALRM signal, use it to cause an exception if and
         # when this function runs too long.  Otherwise check the time taken
         # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
+        if self.timeout <= 0:
+            self.handle_timeout(None, None)
+        if hasattr(signal, 'SIGALRM') and isinstance(threading.current_thread(), threading._MainThread):
             old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
             try:
                 result = self.function(*args, **keyArgs)
             finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
         else:
             startTime = time.time()
             result = self.function(*args, **keyArgs)
@@ -547,6 +558,39 @@ class TimeoutFunction:
         return result
 
 
+class Deadline:
+    """
+    A wall clock budget in milliseconds, started when the Deadline is made.
+    Search loops poll it between iterations and return their best action so
+    far once it has expired:
+
+      deadline = Deadline(40)
+      while not deadline.expired():
+          ...
+
+    A Deadline of None never expires.
+    """
+    def __init__(self, milliseconds=None):
+        self.milliseconds = milliseconds
+        self.start = time.time()
+        if milliseconds == None:
+            self.end = None
+        else:
+            self.end = self.start + milliseconds / 1000.0
+
+    def expired(self):
+        return self.end != None and time.time() >= self.end
+
+    def elapsed(self):
+        "Milliseconds since the deadline was started"
+        return (time.time() - self.start) * 1000.0
+
+    def remaining(self):
+        "Milliseconds left, or None for a deadline that never expires"
+        if self.end == None: return None
+        return max(0.0, (self.end - time.time()) * 1000.0)
+
+
 
 _ORIGINAL_STDOUT = None
 _ORIGINAL_STDERR = None
@@ -556,6 +600,9 @@ class WritableNull:
     def write(self, string):
         pass
 
+    def flush(self):
+        pass
+
 def mutePrint():
     global _ORIGINAL_STDOUT, _ORIGINAL_STDERR, _MUTED
     if _MUTED:
@@ -575,3 +622,29 @@ def unmutePrint():
 
     sys.stdout = _ORIGINAL_STDOUT
     #sys.stderr = _ORIGINAL_STDERR
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    A logging handler that writes to whatever sys.stdout is when a record is
+    logged, not the one it was created with, so that mutePrint and Game.mute
+    silence log messages like they silence print.
+    """
+    def _getStream(self):
+        return sys.stdout
+
+    def _setStream(self, stream):
+        pass
+
+    stream = property(_getStream, _setStream)
+
+def configureLogging(level):
+    """
+    Sends log messages of the given level and above to sys.stdout (see
+    StdoutHandler), unless logging was configured already.
+    """
+    root = logging.getLogger()
+    if len(root.handlers) == 0:
+        handler = StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        root.addHandler(handler)
+    root.setLevel(level)
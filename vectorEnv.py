@@ -0,0 +1,293 @@
+# vectorEnv.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Steps many independent Pacman games on one layout in lockstep with NumPy.
+
+  env = VectorPacmanEnv(layout, numGames=4096, seed=0)
+  while not env.done.all():
+      env.step(env.randomLegalActions())
+  print env.scores
+
+Every game holds agent positions (in half-cell units, so scared ghosts fit
+in ints), directions, scared timers, a food mask, a capsule mask and a score.
+One step() is one pacman move followed by one move of every ghost, like
+GameState.generatePacmanSuccessor; the ghosts behave like RandomGhost
+(uniform over their legal actions).  Finished games stay frozen until
+reset().  validate() replays a batch through the scalar GameState engine and
+raises an Exception at the first disagreement.
+
+Requires numpy.
+"""
+
+from game import Actions
+from game import Directions
+from bitboard import DIRECTIONS, DIRECTION_INDEX, STOP
+import pacman
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except ImportError:
+    _NUMPY_ENABLED = False
+
+class VectorPacmanEnv:
+    """
+    numGames copies of the initial state of a layout, advanced together.
+    Direction arguments and results are indices into bitboard.DIRECTIONS.
+    """
+    def __init__( self, layout, numGames, numGhosts=None, seed=None ):
+        if not _NUMPY_ENABLED: raise Exception('VectorPacmanEnv requires numpy')
+        self.layout = layout
+        self.numGames = numGames
+        self.random = numpy.random.RandomState(seed)
+        self._buildTables()
+
+        if numGhosts == None: numGhosts = layout.getNumGhosts()
+        starts = []
+        ghosts = 0
+        for isPacman, pos in layout.agentPositions:
+            if not isPacman:
+                if ghosts == numGhosts: continue # Max ghosts reached already
+                else: ghosts += 1
+            starts.append(pos)
+        self.numAgents = len(starts)
+        self.startX2 = numpy.array([2 * x for x, y in starts], dtype=numpy.int16)
+        self.startY2 = numpy.array([2 * y for x, y in starts], dtype=numpy.int16)
+
+        shape = (numGames, self.numAgents)
+        self.x2 = numpy.zeros(shape, dtype=numpy.int16)
+        self.y2 = numpy.zeros(shape, dtype=numpy.int16)
+        self.directions = numpy.zeros(shape, dtype=numpy.int8)
+        self.timers = numpy.zeros(shape, dtype=numpy.int16)
+        self.food = numpy.zeros((numGames, layout.width, layout.height), dtype=bool)
+        self.capsules = numpy.zeros((numGames, layout.width, layout.height), dtype=bool)
+        self.numFood = numpy.zeros(numGames, dtype=numpy.int32)
+        self.scores = numpy.zeros(numGames, dtype=numpy.int32)
+        self.win = numpy.zeros(numGames, dtype=bool)
+        self.lose = numpy.zeros(numGames, dtype=bool)
+        # The ghost moves of the last step(), -1 where a ghost did not move
+        self.lastGhostActions = numpy.zeros(shape, dtype=numpy.int8)
+        self.reset()
+
+    def _buildTables( self ):
+        layout = self.layout
+        w, h = layout.width, layout.height
+        vectors = [Actions._directions[direction] for direction in DIRECTIONS]
+        self.dx = numpy.array([dx for dx, dy in vectors], dtype=numpy.int16)
+        self.dy = numpy.array([dy for dx, dy in vectors], dtype=numpy.int16)
+        self.pacmanLegal = numpy.zeros((w, h, len(DIRECTIONS)), dtype=bool)
+        self.ghostChoices = numpy.zeros((w, h, len(DIRECTIONS), 4), dtype=numpy.int8) + STOP
+        self.ghostCounts = numpy.zeros((w, h, len(DIRECTIONS)), dtype=numpy.int8)
+        for x, y in layout.walls.asList(False):
+            for action in layout.getLegalActions((x, y), Directions.STOP):
+                self.pacmanLegal[x, y, DIRECTION_INDEX[action]] = True
+            for d, direction in enumerate(DIRECTIONS):
+                ghostActions = layout.getLegalGhostActions((x, y), direction)
+                self.ghostCounts[x, y, d] = len(ghostActions)
+                for i, action in enumerate(ghostActions):
+                    self.ghostChoices[x, y, d, i] = DIRECTION_INDEX[action]
+
+    def reset( self, mask=None ):
+        """
+        Puts the games selected by the boolean mask (default: all) back in
+        the initial state of the layout.
+        """
+        if mask is None: mask = numpy.ones(self.numGames, dtype=bool)
+        layout = self.layout
+        self.x2[mask] = self.startX2
+        self.y2[mask] = self.startY2
+        self.directions[mask] = STOP
+        self.timers[mask] = 0
+        food = numpy.array(layout.food.data, dtype=bool)
+        capsules = numpy.zeros((layout.width, layout.height), dtype=bool)
+        for x, y in layout.capsules: capsules[x, y] = True
+        self.food[mask] = food
+        self.capsules[mask] = capsules
+        self.numFood[mask] = food.sum()
+        self.scores[mask] = 0
+        self.win[mask] = False
+        self.lose[mask] = False
+        self.lastGhostActions[mask] = -1
+
+    ##############
+    # Observers  #
+    ##############
+    def _getDone( self ):
+        return self.win | self.lose
+    done = property(_getDone)
+
+    def pacmanPositions( self ):
+        return numpy.stack([self.x2[:, 0] // 2, self.y2[:, 0] // 2], axis=1)
+
+    def ghostPositions( self ):
+        """
+        Returns a (numGames, numGhosts, 2) float array of ghost positions.
+        """
+        return numpy.stack([self.x2[:, 1:] / 2.0, self.y2[:, 1:] / 2.0], axis=2)
+
+    def legalPacmanActions( self ):
+        """
+        Returns a (numGames, len(DIRECTIONS)) boolean mask of the legal pacman
+        moves, STOP excluded, as in GameState.getLegalPacmanActions.
+        """
+        legal = self.pacmanLegal[self.x2[:, 0] // 2, self.y2[:, 0] // 2].copy()
+        legal[:, STOP] = False
+        legal[self.done] = False
+        return legal
+
+    def randomLegalActions( self ):
+        """
+        Picks a uniformly random legal pacman move in every game (STOP in
+        games that are over).
+        """
+        legal = self.legalPacmanActions()
+        counts = legal.sum(axis=1)
+        picks = (self.random.random_sample(self.numGames) * counts).astype(numpy.int32)
+        actions = numpy.argmax(legal.cumsum(axis=1) > picks[:, None], axis=1).astype(numpy.int8)
+        actions[counts == 0] = STOP
+        return actions
+
+    #############
+    # Stepping  #
+    #############
+    def step( self, actions ):
+        """
+        Advances every unfinished game by one pacman move (actions, an int
+        array of direction indices; illegal moves become STOP) and one random
+        move per ghost.  Returns (scores, done).
+        """
+        actions = numpy.asarray(actions)
+        self.lastGhostActions[:] = -1
+        games = numpy.nonzero(~self.done)[0]
+
+        # Pacman moves whole cells only, so he is always on a grid point
+        x2, y2 = self.x2[games, 0], self.y2[games, 0]
+        action = actions[games]
+        legal = self.pacmanLegal[x2 // 2, y2 // 2, action]
+        action = numpy.where(legal, action, STOP)
+        x2 = x2 + 2 * self.dx[action]
+        y2 = y2 + 2 * self.dy[action]
+        self.x2[games, 0], self.y2[games, 0] = x2, y2
+        self.directions[games, 0] = numpy.where(action != STOP, action, self.directions[games, 0])
+
+        # Eat
+        scoreChange = numpy.zeros(len(games), dtype=numpy.int32)
+        x, y = x2 // 2, y2 // 2
+        ate = self.food[games, x, y]
+        self.food[games[ate], x[ate], y[ate]] = False
+        self.numFood[games] -= ate
+        scoreChange += 10 * ate
+        won = ate & (self.numFood[games] == 0)
+        scoreChange += 500 * won
+        self.win[games] |= won
+        capsule = self.capsules[games, x, y]
+        self.capsules[games[capsule], x[capsule], y[capsule]] = False
+        self.timers[games[capsule], 1:] = pacman.SCARED_TIME
+
+        scoreChange -= pacman.TIME_PENALTY
+        for index in range(1, self.numAgents):
+            self._checkDeath(games, index, scoreChange)
+        self.scores[games] += scoreChange
+
+        for index in range(1, self.numAgents):
+            self._moveGhost(index)
+        return self.scores, self.done
+
+    def _moveGhost( self, index ):
+        games = numpy.nonzero(~self.done)[0]
+        x2, y2 = self.x2[games, index], self.y2[games, index]
+        direction = self.directions[games, index]
+        onGrid = (x2 % 2 == 0) & (y2 % 2 == 0)
+        x, y = x2 // 2, y2 // 2
+
+        # Uniform choice among the legal actions (RandomGhost); in between
+        # grid points ghosts must continue straight
+        counts = numpy.where(onGrid, self.ghostCounts[x, y, direction], 1)
+        picks = (self.random.random_sample(len(games)) * counts).astype(numpy.int32)
+        action = numpy.where(onGrid, self.ghostChoices[x, y, direction, numpy.minimum(picks, 3)], direction)
+        self.lastGhostActions[games, index] = action
+
+        timer = self.timers[games, index]
+        speed = numpy.where(timer > 0, 1, 2)
+        x2 = x2 + speed * self.dx[action]
+        y2 = y2 + speed * self.dy[action]
+        self.directions[games, index] = numpy.where(action != STOP, action, direction)
+
+        # Time passes; a ghost that stops being scared snaps to the grid
+        snap = timer == 1
+        x2 = numpy.where(snap, 2 * ((x2 + 1) // 2), x2)
+        y2 = numpy.where(snap, 2 * ((y2 + 1) // 2), y2)
+        self.x2[games, index], self.y2[games, index] = x2, y2
+        self.timers[games, index] = numpy.maximum(timer - 1, 0)
+
+        scoreChange = numpy.zeros(len(games), dtype=numpy.int32)
+        self._checkDeath(games, index, scoreChange)
+        self.scores[games] += scoreChange
+
+    def _checkDeath( self, games, index, scoreChange ):
+        distance = numpy.abs(self.x2[games, index] - self.x2[games, 0]) + \
+                   numpy.abs(self.y2[games, index] - self.y2[games, 0])
+        hit = distance <= int(2 * pacman.COLLISION_TOLERANCE)
+        scared = self.timers[games, index] > 0
+
+        eaten = hit & scared
+        scoreChange += 200 * eaten
+        eatenGames = games[eaten]
+        self.x2[eatenGames, index] = self.startX2[index]
+        self.y2[eatenGames, index] = self.startY2[index]
+        self.directions[eatenGames, index] = STOP
+        self.timers[eatenGames, index] = 0
+
+        killed = hit & ~scared & ~self.win[games]
+        scoreChange -= 500 * killed
+        self.lose[games[killed]] = True
+
+def validate( layout, numGames, steps, seed=0 ):
+    """
+    Steps a VectorPacmanEnv with random legal moves and replays every game
+    through pacman.GameState.generateSuccessor with the same pacman and ghost
+    moves.  Returns the number of states compared; raises an Exception at the
+    first state the two engines disagree on.
+    """
+    env = VectorPacmanEnv(layout, numGames, seed=seed)
+    initState = pacman.GameState()
+    initState.initialize(layout, layout.getNumGhosts())
+    states = [initState] * numGames
+    compared = 0
+    for t in range(steps):
+        wasDone = env.done.copy()
+        actions = env.randomLegalActions()
+        env.step(actions)
+        for g in range(numGames):
+            if wasDone[g]: continue
+            state = states[g].generateSuccessor(0, DIRECTIONS[actions[g]])
+            for index in range(1, state.getNumAgents()):
+                if state.isWin() or state.isLose(): break
+                state = state.generateSuccessor(index, DIRECTIONS[env.lastGhostActions[g, index]])
+            states[g] = state
+            compared += 1
+            if not _sameState(env, g, state):
+                raise Exception('vector game %d disagrees with GameState after step %d' % (g, t + 1))
+    return compared
+
+def _sameState( env, game, state ):
+    positions = [(env.x2[game, i] / 2.0, env.y2[game, i] / 2.0) for i in range(env.numAgents)]
+    expected = [state.getPacmanPosition()] + state.getGhostPositions()
+    timers = [int(t) for t in env.timers[game, 1:]]
+    return positions == [tuple(map(float, p)) for p in expected] and \
+           timers == [s.scaredTimer for s in state.getGhostStates()] and \
+           env.scores[game] == state.getScore() and \
+           env.win[game] == state.isWin() and env.lose[game] == state.isLose() and \
+           env.numFood[game] == state.getNumFood()
@@ -0,0 +1,127 @@
+# vectorGA.py
+# -----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A genetic algorithm over pacman action sequences, with the whole population
+held in one NumPy int8 matrix (one row per sequence, one 2 bit action code
+per column) so that selection, crossover and mutation are array operations:
+
+  population = Population(popSize=2048, seqLength=8, seed=0)
+  population.evaluate(gameState, sequenceTrie.SequenceEvaluator())
+  while ...:
+      population.evolve()
+      population.evaluate(gameState, evaluator)
+  sequence, score, truncation = population.best()
+
+For rolling horizon search, shift() moves every row on by the action played
+and keep() puts last move's best sequence back in.
+
+Fitness is the score from sequenceTrie.SequenceEvaluator, so identical rows
+and shared prefixes are only simulated once.  The operators follow
+GeneticAgent: rank selection (the worst sequence is never picked), uniform
+crossover with probability 0.7 and a 10% chance of one random action change.
+
+Requires numpy.
+"""
+
+from game import Directions
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except ImportError:
+    _NUMPY_ENABLED = False
+
+# Action codes, in the order of GameState.getAllPossibleActions
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+class Population:
+    """
+    popSize random sequences of seqLength actions, with the score and
+    truncation point (see SequenceEvaluator.evaluate) of each row.
+    """
+    def __init__( self, popSize, seqLength, seed=None, crossoverRate=0.7, mutationRate=0.1 ):
+        if not _NUMPY_ENABLED: raise Exception('vectorGA requires numpy')
+        self.popSize = popSize
+        self.seqLength = seqLength
+        self.crossoverRate = crossoverRate
+        self.mutationRate = mutationRate
+        self.random = numpy.random.RandomState(seed)
+        self.genes = self.random.randint(0, len(ACTIONS), (popSize, seqLength)).astype(numpy.int8)
+        self.scores = numpy.zeros(popSize)
+        self.truncations = numpy.zeros(popSize, dtype=numpy.int32) + seqLength
+
+    def sequences( self, rows=None ):
+        "The rows (default: all) as lists of Directions."
+        if rows is None: rows = self.genes
+        return [[ACTIONS[code] for code in row] for row in rows.tolist()]
+
+    def evaluate( self, state, evaluator ):
+        """
+        Scores every row from state.  Each distinct row is handed to the
+        evaluator once.  Returns False, leaving the scores as they were, when
+        the forward model budget ran out.
+        """
+        unique, inverse = numpy.unique(self.genes, axis=0, return_inverse=True)
+        results = evaluator.evaluate(state, self.sequences(unique))
+        for score, truncation in results:
+            if score is None: return False
+        scores = numpy.array([score for score, truncation in results])
+        truncations = numpy.array([truncation for score, truncation in results], dtype=numpy.int32)
+        self.scores = scores[inverse]
+        self.truncations = truncations[inverse]
+        return True
+
+    def evolve( self ):
+        """
+        Replaces the population by popSize children: parents are drawn with
+        probability proportional to their rank, crossed over uniformly, and
+        mutated.
+        """
+        n = self.popSize
+        ranks = numpy.empty(n)
+        ranks[numpy.argsort(self.scores, kind='mergesort')] = numpy.arange(n)
+        if ranks.sum() > 0:
+            weights = ranks / ranks.sum()
+        else:
+            weights = None
+        moms = self.random.choice(n, n, p=weights)
+        dads = self.random.choice(n, n, p=weights)
+
+        cross = self.random.random_sample(n) < self.crossoverRate
+        fromDad = (self.random.random_sample((n, self.seqLength)) < 0.5) & cross[:, None]
+        children = numpy.where(fromDad, self.genes[dads], self.genes[moms])
+
+        mutants = numpy.nonzero(self.random.random_sample(n) < self.mutationRate)[0]
+        positions = self.random.randint(0, self.seqLength, len(mutants))
+        children[mutants, positions] = self.random.randint(0, len(ACTIONS), len(mutants))
+        self.genes = children.astype(numpy.int8)
+
+    def shift( self ):
+        """
+        Drops the first action of every row (the one just played) and
+        appends a random one, for rolling horizon search.
+        """
+        tail = self.random.randint(0, len(ACTIONS), (self.popSize, 1)).astype(numpy.int8)
+        self.genes = numpy.hstack([self.genes[:, 1:], tail])
+
+    def keep( self, sequence ):
+        "Puts sequence (a list of Directions) in place of the lowest scoring row."
+        codes = [ACTIONS.index(action) for action in sequence]
+        self.genes[int(numpy.argmin(self.scores)), :len(codes)] = codes
+
+    def best( self ):
+        "Returns (sequence, score, truncation) of the highest scoring row."
+        row = int(numpy.argmax(self.scores))
+        return self.sequences(self.genes[row:row + 1])[0], float(self.scores[row]), int(self.truncations[row])